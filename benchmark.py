@@ -0,0 +1,286 @@
+"""Воспроизводимый бенчмарк методов стеганографии: python -m benchmark [--output FILE] [--compare BASELINE]
+
+Для каждого метода и синтетического WAV-файла заданной длительности замеряются скорость
+встраивания/извлечения (МБ/с несущего файла), пиковый RSS и корректность извлечения.
+Каждый замер выполняется в отдельном процессе, чтобы пиковый RSS относился только к нему.
+Сигнальные методы замеряются также с помехоустойчивым кодом (имя метода с суффиксом +fec),
+а сам код fec.py — отдельно, в МБ/с данных (--fec-sizes).
+Результаты сохраняются в JSON; с --compare они сравниваются с ранее сохранённой базой.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import fec
+from methods import ENCODERS, SignalEncoder, get_encoder
+from wavmap import read_wav_header
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CORPUS_DIR = "template/text_incoding"
+FRAMERATE = 44100
+DEFAULT_DURATIONS = [10, 60, 300]
+METHODS = list(ENCODERS)
+# Размеры данных для замера кодирования/декодирования FEC
+DEFAULT_FEC_SIZES = [1 << 20, 1 << 24]
+# Исследовательский LSB извлекает сообщение побайтно по всему файлу — ограничиваем длительность
+MAX_DURATION = {"lsb-research": 60}
+RESEARCH_MESSAGE = "The quick brown fox jumps over the lazy dog. 0123456789 "
+
+
+def make_synthetic_wav(path, duration, framerate=FRAMERATE, seed=0):
+    """Запись моно 16-битного WAV с окрашенным шумом (похожим на речь/музыку по спектру)."""
+    rng = np.random.default_rng(seed)
+    kernel = np.hanning(32) / np.hanning(32).sum()
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(framerate)
+        remaining = int(duration * framerate)
+        while remaining:
+            count = min(remaining, framerate * 10)
+            signal = np.convolve(rng.standard_normal(count), kernel, mode='same') * 40000
+            wav.writeframes(np.clip(signal, -32768, 32767).astype(np.int16).tobytes())
+            remaining -= count
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    """Тексты из корпуса шаблонов, по возрастанию размера."""
+    corpus = {}
+    for path in glob.glob(os.path.join(corpus_dir, "*.txt")):
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return dict(sorted(corpus.items(), key=lambda item: len(item[1])))
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def _best_time(func, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _run_coder(method, wav_path, output_path, message, num_bits, repeat, use_fec=False):
+    """Встраивание и извлечение одним методом.
+
+    Возвращает (время embed, время extract, извлечённое, статистика embed).
+    """
+    if method == "lsb":
+        encoder = get_encoder(method, num_bits=num_bits)
+    elif use_fec:
+        encoder = get_encoder(method, fec=True)
+    else:
+        encoder = get_encoder(method)
+    embed = lambda: encoder.embed(wav_path, output_path, message)
+    extract = lambda: encoder.extract(output_path, len(message))
+
+    # Исследовательские кодеры печатают служебные сообщения
+    with contextlib.redirect_stdout(io.StringIO()):
+        embed_time, stats = _best_time(embed, repeat)
+        extract_time, extracted = _best_time(extract, repeat)
+    return embed_time, extract_time, extracted, stats
+
+
+def run_case(case):
+    """Один замер (выполняется в отдельном процессе)."""
+    carrier_mb = os.path.getsize(case["wav"]) / 2 ** 20
+    output_path = os.path.join(case["workdir"], f"{case['name'].replace('/', '_')}.wav")
+    result = {key: case[key] for key in ("name", "method", "duration", "num_bits", "payload", "payload_bytes")}
+    try:
+        embed_time, extract_time, extracted, stats = _run_coder(case["method"], case["wav"], output_path,
+                                                                case["message"], case["num_bits"], case["repeat"],
+                                                                case["fec"])
+        result.update({key: stats[key] for key in ("codec", "stored_bytes", "compress_time") if key in stats})
+        result.update(
+            embed_s=embed_time,
+            extract_s=extract_time,
+            embed_mb_s=carrier_mb / embed_time,
+            extract_mb_s=carrier_mb / extract_time,
+            roundtrip=extracted == case["message"],
+            error=None
+        )
+    except Exception as e:
+        result.update(roundtrip=False, error=str(e))
+    result["peak_rss_mb"] = _peak_rss_mb()
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    return result
+
+
+def build_cases(methods, durations, num_bits_list, corpus, wav_paths, workdir, repeat):
+    """Список замеров: LSB — по всем num_bits и всем помещающимся текстам корпуса."""
+    cases = []
+
+    def add(method, duration, num_bits, payload, message, payload_bytes, use_fec=False):
+        cases.append({
+            "name": f"{method}{'+fec' if use_fec else ''}/{duration:g}s/bits{num_bits}/{payload}",
+            "method": method,
+            "fec": use_fec,
+            "duration": duration,
+            "num_bits": num_bits,
+            "payload": payload,
+            "payload_bytes": payload_bytes,
+            "message": message,
+            "wav": wav_paths[duration],
+            "workdir": workdir,
+            "repeat": repeat
+        })
+
+    for duration in durations:
+        params = read_wav_header(wav_paths[duration])
+        for method in methods:
+            if duration > MAX_DURATION.get(method, float('inf')):
+                continue
+            if method == "lsb":
+                for num_bits in num_bits_list:
+                    capacity = get_encoder(method, num_bits=num_bits).capacity(params)
+                    for payload, text in corpus.items():
+                        size = len(text.encode('utf-8'))
+                        if size <= capacity:
+                            add(method, duration, num_bits, payload, text, size)
+                continue
+            # Исследовательские кодеры и сигнальные методы — с малой ёмкостью: короткое ASCII-сообщение
+            length = {"lsb-research": 4096, "echo": 64, "phase": 4096 // 2 // 8 - 3}[method]
+            length = min(length, get_encoder(method).capacity(params))
+            message = (RESEARCH_MESSAGE * (length // len(RESEARCH_MESSAGE) + 1))[:length]
+            add(method, duration, 1, f"ascii{length}", message, length)
+            if issubclass(ENCODERS[method], SignalEncoder):
+                # Кадр FEC вдвое длиннее сообщения и начинается с копий закодированной длины
+                length = min((length - fec.frame_header_size()) // 2,
+                             get_encoder(method, fec=True).capacity(params))
+                if length < 1:
+                    continue
+                add(method, duration, 1, f"ascii{length}", message[:length], length, use_fec=True)
+    return cases
+
+
+def run_fec_case(size, repeat, seed=0):
+    """Скорость кодирования и декодирования FEC для size случайных байтов (МБ/с данных)."""
+    data = np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8).tobytes()
+    encode_time, coded = _best_time(lambda: fec.encode(data), repeat)
+    decode_time, (decoded, report) = _best_time(lambda: fec.decode(coded), repeat)
+    size_mb = size / 2 ** 20
+    return {
+        "name": f"fec/{size}",
+        "size": size,
+        "encode_mb_s": size_mb / encode_time,
+        "decode_mb_s": size_mb / decode_time,
+        "roundtrip": decoded == data and not report["corrected"] and not report["uncorrectable"]
+    }
+
+
+def compare_results(results, baseline, tolerance):
+    """Сравнение с базой: падение скорости больше tolerance или потеря корректности — регрессия."""
+    previous = {item["name"]: item for item in baseline["results"]}
+    regressions = []
+    for item in results:
+        old = previous.get(item["name"])
+        if old is None:
+            continue
+        problems = []
+        if old.get("roundtrip") and not item.get("roundtrip"):
+            problems.append("roundtrip")
+        for key in ("embed_mb_s", "extract_mb_s", "encode_mb_s", "decode_mb_s"):
+            if old.get(key) and item.get(key) is not None:
+                ratio = item[key] / old[key]
+                item[f"{key}_ratio"] = ratio
+                if ratio < 1 - tolerance:
+                    problems.append(f"{key} x{ratio:.2f}")
+        if problems:
+            regressions.append((item["name"], problems))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Бенчмарк методов стеганографии.")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--durations", nargs="+", type=float, default=DEFAULT_DURATIONS,
+                        help="длительности синтетических WAV в секундах")
+    parser.add_argument("--num-bits", nargs="+", type=int, default=list(range(1, 9)))
+    parser.add_argument("--fec-sizes", nargs="+", type=int, default=DEFAULT_FEC_SIZES,
+                        help="размеры данных в байтах для замера FEC (0 — не замерять)")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help=f"папка с текстами (по умолчанию {CORPUS_DIR})")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов на замер (берётся лучший)")
+    parser.add_argument("--output", help="файл для сохранения результатов в JSON")
+    parser.add_argument("--compare", help="JSON с базовыми результатами для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое падение скорости (доля)")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        wav_paths = {}
+        for duration in args.durations:
+            wav_paths[duration] = os.path.join(workdir, f"synthetic_{duration:g}s.wav")
+            make_synthetic_wav(wav_paths[duration], duration)
+
+        cases = build_cases(args.methods, args.durations, args.num_bits, corpus, wav_paths, workdir, args.repeat)
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(run_case, case).result()
+            results.append(result)
+            status = "ok" if result["roundtrip"] else (result["error"] or "mismatch")
+            if result["error"] is None:
+                print(f"{result['name']:<45} embed {result['embed_mb_s']:9.1f} МБ/с  "
+                      f"extract {result['extract_mb_s']:9.1f} МБ/с  RSS {result['peak_rss_mb'] or 0:7.1f} МБ  {status}")
+            else:
+                print(f"{result['name']:<45} {status}")
+
+    for size in args.fec_sizes:
+        if size <= 0:
+            continue
+        result = run_fec_case(size, args.repeat)
+        results.append(result)
+        print(f"{result['name']:<45} encode {result['encode_mb_s']:8.1f} МБ/с  "
+              f"decode {result['decode_mb_s']:8.1f} МБ/с  {'ok' if result['roundtrip'] else 'mismatch'}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        for name, problems in regressions:
+            print(f"РЕГРЕССИЯ {name}: {', '.join(problems)}")
+        print(f"Регрессий: {len(regressions)}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "repeat": args.repeat
+            },
+            "results": results
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Упаковка байтов в биты и группы битов (np.packbits/np.unpackbits) без строк из '0'/'1'.
+
+order="msb" — биты берутся из байта начиная со старшего и первый бит группы старший;
+order="lsb" — начиная с младшего, первый бит группы младший. При width=8 группы совпадают с байтами.
+"""
+import numpy as np
+
+BIT_ORDERS = {"msb": "big", "lsb": "little"}
+# Размер блока байтов для потоковой упаковки
+CHUNK_BYTES = 1 << 16
+
+
+def _bitorder(order):
+    if order not in BIT_ORDERS:
+        raise ValueError(f"Неизвестный порядок битов: {order}")
+    return BIT_ORDERS[order]
+
+
+def _check_width(width):
+    if not 1 <= width <= 8:
+        raise ValueError("Ширина группы должна быть от 1 до 8 битов!")
+
+
+def _as_array(data):
+    """bytes, bytearray, memoryview или массив uint8 — без копирования."""
+    if isinstance(data, np.ndarray):
+        return data.view(np.uint8).ravel()
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def to_bits(data, order="msb"):
+    """Массив битов (uint8, 0/1) из байтов."""
+    return np.unpackbits(_as_array(data), bitorder=_bitorder(order))
+
+
+def from_bits(bits, order="msb"):
+    """Байты из массива битов (неполный последний байт дополняется нулями)."""
+    return np.packbits(np.asarray(bits, dtype=np.uint8), bitorder=_bitorder(order)).tobytes()
+
+
+def to_groups(data, width, order="msb"):
+    """Значения групп по width битов (uint8); неполная последняя группа дополняется нулями."""
+    _check_width(width)
+    bits = to_bits(data, order)
+    pad = -len(bits) % width
+    if pad:
+        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+    values = np.packbits(bits.reshape(-1, width), axis=1, bitorder=_bitorder(order)).ravel()
+    # packbits выравнивает группу по старшему биту байта
+    return values >> (8 - width) if order == "msb" else values
+
+
+def from_groups(values, width, order="msb", count=None):
+    """Байты из значений групп по width битов; count — сколько байтов вернуть (по умолчанию все полные)."""
+    _check_width(width)
+    columns = np.unpackbits(np.asarray(values, dtype=np.uint8)[:, None], axis=1, bitorder=_bitorder(order))
+    bits = columns[:, 8 - width:] if order == "msb" else columns[:, :width]
+    bits = bits.ravel()
+    if count is None:
+        count = len(bits) // 8
+    return from_bits(bits[:count * 8], order)
+
+
+def rechunk(chunks, size, head=()):
+    """Поток блоков произвольной длины -> блоки заданной длины.
+
+    Сначала выдаются блоки длиной из head, затем по size байтов; последний блок может быть короче.
+    """
+    sizes = iter(head)
+    want = next(sizes, size)
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= want:
+            yield bytes(buffer[:want])
+            del buffer[:want]
+            want = next(sizes, size)
+    if buffer:
+        yield bytes(buffer)
+
+
+def iter_groups(data, width, order="msb", chunk_bytes=CHUNK_BYTES):
+    """Потоковая упаковка: группы по width битов блоками из chunk_bytes байтов данных.
+
+    data — байты или итератор блоков байтов произвольной длины (например, из шифратора).
+    Размер блока округляется до кратного width, поэтому группы не разрываются между блоками
+    и каждый блок, кроме последнего, содержит ровно chunk_bytes * 8 // width групп.
+    """
+    _check_width(width)
+    step = max(width, chunk_bytes // width * width)
+    if isinstance(data, (bytes, bytearray, memoryview, np.ndarray)):
+        data = _as_array(data)
+        blocks = (data[start:start + step] for start in range(0, len(data), step))
+    else:
+        blocks = rechunk(data, step)
+    for block in blocks:
+        yield to_groups(block, width, order)
@@ -0,0 +1,78 @@
+"""Аналитический расчёт ёмкости WAV-файлов для всех методов (без чтения сэмплов).
+
+Заголовки WAV кэшируются в SQLite-индексе по пути, mtime и размеру файла, поэтому
+повторный выбор файлов из большой библиотеки не открывает их заново.
+"""
+import json
+import os
+import sqlite3
+
+from methods import ENCODERS, get_encoder
+from wavmap import read_wav_header
+
+INDEX_FILE = "template/wav_index.sqlite"
+
+
+class HeaderIndex:
+    """Постоянный индекс заголовков WAV: путь -> (mtime, размер, параметры read_wav_header)."""
+
+    def __init__(self, index_path=INDEX_FILE):
+        if os.path.dirname(index_path):
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self.connection = sqlite3.connect(index_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS headers ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, header TEXT)"
+        )
+
+    def get(self, wav_path):
+        """Параметры WAV-файла из индекса; при изменении файла заголовок читается заново."""
+        path = os.path.abspath(wav_path)
+        stat = os.stat(path)
+        row = self.connection.execute(
+            "SELECT header FROM headers WHERE path = ? AND mtime_ns = ? AND size = ?",
+            (path, stat.st_mtime_ns, stat.st_size)
+        ).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+
+        header = read_wav_header(path)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO headers (path, mtime_ns, size, header) VALUES (?, ?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size, json.dumps(header))
+            )
+        return header
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def echo_capacity(params, **coder_options):
+    """Ёмкость эхо-кодирования в байтах UTF-8 (кодер работает с первым каналом)."""
+    return get_encoder("echo", **coder_options).capacity(params)
+
+
+def phase_capacity(params, segment_size=4096):
+    """Ёмкость фазового кодирования в байтах UTF-8."""
+    return get_encoder("phase", segment_size=segment_size).capacity(params)
+
+
+def plan_capacity(wav_path, index=None, channels=None):
+    """Ёмкость файла для всех методов реестра: LSB по каждому num_bits и остальные методы — в байтах (UTF-8)."""
+    params = index.get(wav_path) if index is not None else read_wav_header(wav_path)
+    plan = {
+        "params": params,
+        "lsb": {num_bits: get_encoder("lsb", num_bits=num_bits, channels=channels).capacity(params)
+                for num_bits in range(1, 9)}
+    }
+    for name in ENCODERS:
+        if name != "lsb":
+            plan[name] = get_encoder(name).capacity(params)
+    return plan
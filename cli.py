@@ -0,0 +1,250 @@
+"""Консольный пакетный режим: python -m cli {embed,extract,info,analyze,detect} [файлы/папки/маски ...]
+
+Каждый файл обрабатывается в отдельном процессе ProcessPoolExecutor, результат по каждому
+файлу печатается в stdout строкой JSON, итоговая статистика — в stderr.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from compression import CODECS
+from methods import ENCODERS, SignalEncoder, get_encoder
+from metrics import compare_wav_files
+from service import get_wav_info, read_txt_file, lsb_capacity, INPUT_DIR, OUTPUT_DIR
+from steganalysis import analyze_file
+from tracing import Trace
+from wavmap import read_wav_header
+
+ENCODED_PREFIX = re.compile(r"^encoded_(bits\d+|%s)_" % "|".join(map(re.escape, ENCODERS)))
+
+# Параметры команды, передаваемые в процессы пула через initializer
+_options = {}
+
+
+def collect_wav_files(patterns):
+    """Список WAV-файлов по путям, папкам и glob-маскам (без повторов, в исходном порядке)."""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.wav")))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        files.extend(path for path in matches if os.path.isfile(path))
+    return list(dict.fromkeys(files))
+
+
+def _init_worker(options):
+    _options.update(options)
+
+
+def _output_path(folder, path, name):
+    """Путь результата для входного файла path: его папка относительно общей папки входных
+    файлов повторяется внутри folder, поэтому одноимённые файлы из разных папок не совпадают."""
+    relative = os.path.relpath(os.path.dirname(os.path.abspath(path)), _options["input_root"])
+    output_dir = os.path.normpath(os.path.join(folder, relative))
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, name)
+
+
+def _trace_for(path):
+    """Трассировка в отдельный JSON-файл для каждого входного файла (если задан --trace-dir)."""
+    if not _options.get("trace_dir"):
+        return None
+    name = os.path.splitext(os.path.basename(path))[0]
+    return Trace(json_path=_output_path(_options["trace_dir"], path, f"{name}.{_options['command']}.trace.json"))
+
+
+def _encoder_for(path):
+    """Метод из параметров команды (для LSB — с числом битов, каналами и трассировкой)."""
+    if _options["method"] == "lsb":
+        return get_encoder("lsb", num_bits=_options["num_bits"], channels=_options["channels"], trace=_trace_for(path),
+                           key=_options["key"], password=_options["password"],
+                           compression=_options.get("compression", "auto"))
+    # Параметры контейнера LSB другие методы не поддерживают: молча их не отбрасываем
+    for option, flag, default in (("key", "--key", None), ("password", "--password", None),
+                                  ("channels", "--channels", None), ("compression", "--compression", "auto")):
+        if _options.get(option, default) != default:
+            raise ValueError(f"Метод {_options['method']} не поддерживает {flag}!")
+    if _options.get("fec"):
+        if not issubclass(ENCODERS[_options["method"]], SignalEncoder):
+            raise ValueError(f"Метод {_options['method']} не поддерживает --fec!")
+        return get_encoder(_options["method"], fec=True)
+    return get_encoder(_options["method"])
+
+
+def _embed(path):
+    prefix = f"bits{_options['num_bits']}" if _options["method"] == "lsb" else _options["method"]
+    output_path = _output_path(_options["output_dir"], path, f"encoded_{prefix}_{os.path.basename(path)}")
+    stats = _encoder_for(path).embed(path, output_path, _options["message"])
+    return {"output": output_path, **stats}
+
+
+def _extract(path):
+    message, report = _encoder_for(path).extract_with_report(path, _options["length"])
+    if message is None:
+        raise ValueError("Сообщение не найдено!")
+    if isinstance(message, str):
+        return {"message": message, **({"fec": report} if report else {})}
+    output_path = _output_path(_options["output_dir"], path, os.path.splitext(os.path.basename(path))[0] + ".bin")
+    with open(output_path, 'wb') as f:
+        f.write(message)
+    return {"output": output_path, "size": len(message)}
+
+
+def _info(path):
+    params = read_wav_header(path)
+    info = get_wav_info(path, params)
+    info["lsb_capacity"] = {num_bits: lsb_capacity(params, num_bits) for num_bits in range(1, 9)}
+    info["capacity"] = {name: get_encoder(name).capacity(params) for name in ENCODERS if name != "lsb"}
+    return info
+
+
+def _analyze(path):
+    original_name = ENCODED_PREFIX.sub("", os.path.basename(path))
+    relative = os.path.relpath(os.path.dirname(os.path.abspath(path)), _options["input_root"])
+    original_path = os.path.normpath(os.path.join(_options["original_dir"], relative, original_name))
+    return {"original": original_path, **compare_wav_files(original_path, path)}
+
+
+COMMANDS = {
+    "embed": _embed,
+    "extract": _extract,
+    "info": _info,
+    "analyze": _analyze,
+    "detect": analyze_file
+}
+
+
+def process_file(path):
+    """Выполнение команды над одним файлом. Ошибки возвращаются в результате, а не выбрасываются."""
+    start_time = time.time()
+    result = {"file": path}
+    try:
+        result.update(COMMANDS[_options["command"]](path))
+        result["ok"] = True
+    except Exception as e:
+        result.update(ok=False, error=str(e))
+    result["elapsed"] = time.time() - start_time
+    return result
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Пакетная LSB-стеганография WAV-файлов.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, help_text):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("inputs", nargs="*", default=[INPUT_DIR],
+                         help=f"WAV-файлы, папки или glob-маски (по умолчанию {INPUT_DIR})")
+        sub.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                         help="количество процессов (по умолчанию число ядер)")
+        return sub
+
+    embed = add_command("embed", "скрыть сообщение в каждом файле")
+    source = embed.add_mutually_exclusive_group(required=True)
+    source.add_argument("-m", "--message", help="текст сообщения")
+    source.add_argument("-t", "--text-file", help="текстовый файл с сообщением (UTF-8)")
+    source.add_argument("-p", "--payload-file", help="двоичный файл для скрытия")
+    embed.add_argument("--method", choices=list(ENCODERS), default="lsb", help="метод стеганографии (по умолчанию lsb)")
+    embed.add_argument("-b", "--num-bits", type=int, default=1, help="количество младших битов (1-8, только lsb)")
+    embed.add_argument("-o", "--output-dir", default=OUTPUT_DIR, help=f"папка результатов (по умолчанию {OUTPUT_DIR})")
+    embed.add_argument("-c", "--channels", type=int, nargs="+",
+                       help="номера каналов для встраивания (по умолчанию все каналы поочерёдно)")
+    embed.add_argument("-k", "--key", help="ключ для рассеивания сообщения по всему файлу (только lsb)")
+    embed.add_argument("--password", help="пароль для шифрования сообщения (только lsb)")
+    embed.add_argument("-z", "--compression", choices=["auto", *CODECS], default="auto",
+                       help="сжатие сообщения (по умолчанию auto — выбор по пробе, только lsb)")
+    embed.add_argument("--fec", action="store_true",
+                       help="помехоустойчивый код Хэмминга с перемежением (только echo и phase)")
+    embed.add_argument("--trace-dir", help="папка для JSON-трассировки фаз и сэмплов (по умолчанию выключена)")
+
+    extract = add_command("extract", "извлечь сообщение из каждого файла")
+    extract.add_argument("--method", choices=list(ENCODERS), default="lsb", help="метод стеганографии (по умолчанию lsb)")
+    extract.add_argument("-b", "--num-bits", type=int, default=None,
+                         help="ожидаемое количество битов (по умолчанию из заголовка, только lsb)")
+    extract.add_argument("-l", "--length", type=int, default=None,
+                         help="длина сообщения в байтах, текст — в UTF-8 (для методов без маркера конца, например echo)")
+    extract.add_argument("-o", "--output-dir", default=OUTPUT_DIR,
+                         help=f"папка для двоичных сообщений (по умолчанию {OUTPUT_DIR})")
+    extract.add_argument("-c", "--channels", type=int, nargs="+",
+                         help="номера каналов, использованные при встраивании (по умолчанию все)")
+    extract.add_argument("-k", "--key", help="ключ, использованный при встраивании")
+    extract.add_argument("--password", help="пароль для зашифрованных сообщений")
+    extract.add_argument("--fec", action="store_true",
+                         help="сообщение встроено с помехоустойчивым кодом (только echo и phase)")
+    extract.add_argument("--trace-dir", help="папка для JSON-трассировки фаз (по умолчанию выключена)")
+
+    add_command("info", "параметры WAV-файлов")
+
+    analyze = add_command("analyze", "сравнить изменённые файлы с исходными")
+    analyze.add_argument("-r", "--original-dir", default=INPUT_DIR,
+                         help=f"папка с исходными файлами (по умолчанию {INPUT_DIR})")
+
+    add_command("detect", "слепой стегоанализ младших битов (хи-квадрат, RS, SPA) без исходных файлов")
+    return parser
+
+
+def main(argv=None):
+    args = _build_parser().parse_args(argv)
+    options = {"command": args.command}
+
+    if args.command == "embed":
+        if args.message is not None:
+            options["message"] = args.message
+        elif args.text_file:
+            options["message"] = read_txt_file(args.text_file)
+        else:
+            with open(args.payload_file, 'rb') as f:
+                options["message"] = f.read()
+        options.update(method=args.method, num_bits=args.num_bits, channels=args.channels, key=args.key,
+                       password=args.password, compression=args.compression, fec=args.fec)
+    elif args.command == "extract":
+        options.update(method=args.method, num_bits=args.num_bits, channels=args.channels, key=args.key,
+                       password=args.password, length=args.length, fec=args.fec)
+    elif args.command == "analyze":
+        options["original_dir"] = args.original_dir
+    if "output_dir" in args:
+        options["output_dir"] = args.output_dir
+        os.makedirs(args.output_dir, exist_ok=True)
+    if getattr(args, "trace_dir", None):
+        options["trace_dir"] = args.trace_dir
+        os.makedirs(args.trace_dir, exist_ok=True)
+
+    files = collect_wav_files(args.inputs)
+    if not files:
+        print("Не найдено ни одного WAV-файла.", file=sys.stderr)
+        return 1
+
+    # Общая папка входных файлов: вложенные папки повторяются в папках результатов
+    options["input_root"] = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+
+    start_time = time.time()
+    total_bytes = 0
+    failed = 0
+    suspicious = inconclusive = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_init_worker,
+                             initargs=(options,)) as executor:
+        futures = [executor.submit(process_file, path) for path in files]
+        for future in as_completed(futures):
+            result = future.result()
+            total_bytes += os.path.getsize(result["file"])
+            failed += not result["ok"]
+            suspicious += bool(result.get("suspicious"))
+            inconclusive += bool(result.get("inconclusive"))
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+
+    elapsed = max(time.time() - start_time, 1e-9)
+    print(f"Файлов: {len(files)} (ошибок: {failed}), время: {elapsed:.2f} с, "
+          f"{len(files) / elapsed:.1f} файл/с, {total_bytes / elapsed / 2 ** 20:.1f} МБ/с", file=sys.stderr)
+    if args.command == "detect":
+        print(f"Подозрительных файлов: {suspicious}, неопределённых: {inconclusive}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
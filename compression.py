@@ -0,0 +1,91 @@
+"""Сжатие сообщения перед встраиванием (zlib, bz2, lzma из стандартной библиотеки).
+
+Алгоритм выбирается по пробе: несколько участков сообщения сжимаются каждым алгоритмом,
+побеждает давший наименьший размер. Если выигрыш меньше MIN_SAVING, сообщение не сжимается.
+Код алгоритма записывается в заголовок контейнера. Сообщения короче MIN_COMPRESS_SIZE
+не сжимаются без пробы. Распаковка идёт через decompressobj с ограничением размера
+результата MAX_DECOMPRESSED_SIZE: небольшая сжатая нагрузка из чужого файла не может
+развернуться в неограниченный объём памяти. Поэтому сообщения больше MAX_DECOMPRESSED_SIZE
+не сжимаются: при codec="auto" они сохраняются как есть, явный алгоритм для них — ошибка.
+"""
+import bz2
+import lzma
+import zlib
+
+# Имя -> (код в заголовке, сжатие, создание потокового распаковщика)
+CODECS = {
+    "none": (0, bytes, None),
+    "zlib": (1, lambda data: zlib.compress(data, 9), zlib.decompressobj),
+    "bz2": (2, lambda data: bz2.compress(data, 9), bz2.BZ2Decompressor),
+    "lzma": (3, lambda data: lzma.compress(data, preset=6), lzma.LZMADecompressor)
+}
+CODEC_NAMES = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+
+# Проба: PROBE_PARTS участков, всего не больше PROBE_SIZE байтов
+PROBE_SIZE = 1 << 16
+PROBE_PARTS = 4
+# Минимальная доля экономии, при которой сжатие имеет смысл
+MIN_SAVING = 0.05
+# Более короткие сообщения не сжимаются: заголовки форматов съедают выигрыш, а проба стоит миллисекунды
+MIN_COMPRESS_SIZE = 128
+# Наибольший размер распакованного сообщения
+MAX_DECOMPRESSED_SIZE = 1 << 26
+
+
+def _probe(payload):
+    """Равномерно расположенные участки сообщения (всё сообщение, если оно короче PROBE_SIZE)."""
+    if len(payload) <= PROBE_SIZE:
+        return bytes(payload)
+    part = PROBE_SIZE // PROBE_PARTS
+    step = (len(payload) - part) // (PROBE_PARTS - 1)
+    return b"".join(bytes(payload[i * step:i * step + part]) for i in range(PROBE_PARTS))
+
+
+def choose_codec(payload):
+    """Имя алгоритма, лучше всего сжимающего пробу сообщения ("none", если сжатие не окупается)."""
+    if len(payload) < MIN_COMPRESS_SIZE:
+        return "none"
+    probe = _probe(payload)
+    sizes = {name: len(compress(probe)) for name, (_, compress, _) in CODECS.items() if name != "none"}
+    best = min(sizes, key=sizes.get)
+    return best if sizes[best] <= len(probe) * (1 - MIN_SAVING) else "none"
+
+
+def compress(payload, codec="auto"):
+    """Сжатие сообщения. Возвращает (имя алгоритма, сжатые данные).
+
+    codec="auto" — выбор по пробе; если сжатые данные не меньше исходных, возвращается "none".
+    Сообщение больше MAX_DECOMPRESSED_SIZE не удалось бы распаковать при извлечении, поэтому
+    при "auto" оно не сжимается, а для явно заданного алгоритма вызывается ValueError.
+    """
+    if codec == "auto":
+        codec = "none" if len(payload) > MAX_DECOMPRESSED_SIZE else choose_codec(payload)
+    if codec not in CODECS:
+        raise ValueError(f"Неизвестный алгоритм сжатия: {codec}")
+    if codec != "none" and len(payload) > MAX_DECOMPRESSED_SIZE:
+        raise ValueError(f"Сообщение больше {MAX_DECOMPRESSED_SIZE} байт нельзя сжимать: "
+                         f"при извлечении размер распакованного сообщения ограничен!")
+    data = CODECS[codec][1](payload)
+    if codec != "none" and len(data) >= len(payload):
+        return "none", bytes(payload)
+    return codec, data
+
+
+def decompress(data, codec_id, max_size=MAX_DECOMPRESSED_SIZE):
+    """Распаковка данных, сжатых алгоритмом с кодом codec_id, не больше max_size байтов."""
+    if codec_id not in CODEC_NAMES:
+        raise ValueError(f"Неизвестный алгоритм сжатия в заголовке: {codec_id}")
+    new_decompressor = CODECS[CODEC_NAMES[codec_id]][2]
+    if new_decompressor is None:
+        return bytes(data)
+    decompressor = new_decompressor()
+    try:
+        # Байт сверх предела означает, что сообщение больше допустимого
+        result = decompressor.decompress(data, max_size + 1)
+    except (zlib.error, OSError, lzma.LZMAError) as e:
+        raise ValueError(f"Ошибка распаковки сообщения: {e}")
+    if len(result) > max_size:
+        raise ValueError(f"Распакованное сообщение больше {max_size} байт!")
+    if not decompressor.eof:
+        raise ValueError("Ошибка распаковки сообщения: данные обрезаны!")
+    return result
@@ -0,0 +1,52 @@
+import struct
+import zlib
+
+# Заголовок контейнера: magic, версия, num_bits, флаги, длина полезной нагрузки, CRC32
+MAGIC = b"LSBS"
+VERSION = 1
+HEADER_FORMAT = ">4sBBHII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Флаги полезной нагрузки
+FLAG_TEXT = 0x0001
+# Нагрузка зашифрована (crypto.py): целостность проверяется MAC, поле CRC32 равно 0
+FLAG_ENCRYPTED = 0x0002
+# Код алгоритма сжатия (compression.py) хранится в старшем байте флагов
+CODEC_SHIFT = 8
+
+
+def pack_header(payload, num_bits, flags=0):
+    """Формирование заголовка для полезной нагрузки payload."""
+    return build_header(len(payload), zlib.crc32(payload), num_bits, flags)
+
+
+def build_header(length, crc32, num_bits, flags=0):
+    """Формирование заголовка по длине и CRC32 нагрузки (когда сама нагрузка ещё не сформирована)."""
+    return struct.pack(HEADER_FORMAT, MAGIC, VERSION, num_bits, flags, length, crc32)
+
+
+def parse_header(data):
+    """Разбор заголовка. Возвращает словарь с полями или вызывает ValueError."""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Файл слишком короткий для заголовка сообщения!")
+    magic, version, num_bits, flags, length, crc = struct.unpack(HEADER_FORMAT, data[:HEADER_SIZE])
+    if magic != MAGIC:
+        raise ValueError("Файл не содержит скрытого сообщения!")
+    if version != VERSION:
+        raise ValueError(f"Неподдерживаемая версия контейнера: {version}")
+    if not 1 <= num_bits <= 8:
+        raise ValueError(f"Некорректное значение num_bits в заголовке: {num_bits}")
+    return {
+        "version": version,
+        "num_bits": num_bits,
+        "flags": flags,
+        "codec": flags >> CODEC_SHIFT,
+        "length": length,
+        "crc32": crc
+    }
+
+
+def check_payload(header, payload):
+    """Проверка длины и CRC32 извлечённой полезной нагрузки."""
+    if len(payload) != header["length"] or zlib.crc32(payload) != header["crc32"]:
+        raise ValueError("Контрольная сумма сообщения не совпадает!")
@@ -0,0 +1,119 @@
+"""Аутентифицированное шифрование сообщения паролем (только стандартная библиотека и NumPy).
+
+Формат зашифрованной нагрузки: заголовок (KDF, соль, nonce, проверочное значение ключа),
+затем блоки по CHUNK_SIZE байтов шифротекста, каждый со своим тегом HMAC-SHA256.
+Ключи выводятся из пароля через scrypt (или PBKDF2-HMAC-SHA256, если scrypt недоступен),
+гамма блока — SHAKE-256 от ключа, nonce и номера блока. Тег блока покрывает его номер и
+признак последнего блока, поэтому перестановка и обрезка блоков обнаруживаются.
+Неверный пароль отбрасывается по проверочному значению в заголовке, до чтения блоков.
+"""
+import hashlib
+import hmac
+import os
+import struct
+
+import numpy as np
+
+from bitpack import rechunk
+
+KDF_SCRYPT = 1
+KDF_PBKDF2 = 2
+PBKDF2_ITERATIONS = 200_000
+SALT_SIZE = 16
+NONCE_SIZE = 16
+CHECK_SIZE = 16
+TAG_SIZE = 16
+CHUNK_SIZE = 1 << 16
+
+CRYPTO_HEADER_FORMAT = f">B{SALT_SIZE}s{NONCE_SIZE}s{CHECK_SIZE}s"
+CRYPTO_HEADER_SIZE = struct.calcsize(CRYPTO_HEADER_FORMAT)
+
+
+def _password_bytes(password):
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    if not password:
+        raise ValueError("Пароль не должен быть пустым!")
+    return bytes(password)
+
+
+def derive_keys(password, salt, kdf):
+    """Ключ шифрования и ключ MAC (по 32 байта) из пароля."""
+    password = _password_bytes(password)
+    if kdf == KDF_SCRYPT:
+        master = hashlib.scrypt(password, salt=salt, n=1 << 14, r=8, p=1, dklen=64)
+    elif kdf == KDF_PBKDF2:
+        master = hashlib.pbkdf2_hmac('sha256', password, salt, PBKDF2_ITERATIONS, dklen=64)
+    else:
+        raise ValueError(f"Неизвестная функция выработки ключа: {kdf}")
+    return master[:32], master[32:]
+
+
+def _key_check(mac_key, nonce):
+    return hmac.new(mac_key, b"key-check" + nonce, 'sha256').digest()[:CHECK_SIZE]
+
+
+def _chunk_count(length):
+    return max(1, -(-length // CHUNK_SIZE))
+
+
+def encrypted_size(length):
+    """Размер зашифрованной нагрузки для сообщения из length байтов."""
+    return CRYPTO_HEADER_SIZE + length + TAG_SIZE * _chunk_count(length)
+
+
+def _apply_keystream(enc_key, nonce, index, data):
+    keystream = hashlib.shake_256(enc_key + nonce + struct.pack(">Q", index)).digest(len(data))
+    return np.bitwise_xor(np.frombuffer(data, dtype=np.uint8), np.frombuffer(keystream, dtype=np.uint8)).tobytes()
+
+
+def _tag(mac_key, nonce, index, final, ciphertext):
+    mac = hmac.new(mac_key, nonce + struct.pack(">QB", index, final), 'sha256')
+    mac.update(ciphertext)
+    return mac.digest()[:TAG_SIZE]
+
+
+def encrypt_stream(password, data):
+    """Потоковое шифрование: заголовок, затем блоки «шифротекст + тег» по мере запроса."""
+    kdf = KDF_SCRYPT if hasattr(hashlib, 'scrypt') else KDF_PBKDF2
+    salt, nonce = os.urandom(SALT_SIZE), os.urandom(NONCE_SIZE)
+    enc_key, mac_key = derive_keys(password, salt, kdf)
+    yield struct.pack(CRYPTO_HEADER_FORMAT, kdf, salt, nonce, _key_check(mac_key, nonce))
+
+    data = memoryview(data).cast('B')
+    count = _chunk_count(len(data))
+    for index in range(count):
+        ciphertext = _apply_keystream(enc_key, nonce, index, data[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE])
+        yield ciphertext + _tag(mac_key, nonce, index, index == count - 1, ciphertext)
+
+
+def decrypt_stream(password, blocks, length):
+    """Потоковая расшифровка нагрузки из length байтов, поступающей блоками blocks.
+
+    Пароль проверяется по заголовку до чтения остальных блоков; при неверном пароле или
+    изменённом шифротексте вызывается ValueError.
+    """
+    if length < CRYPTO_HEADER_SIZE + TAG_SIZE:
+        raise ValueError("Зашифрованное сообщение повреждено!")
+    chunks = rechunk(blocks, CHUNK_SIZE + TAG_SIZE, head=[CRYPTO_HEADER_SIZE])
+    header = next(chunks, b"")
+    if len(header) < CRYPTO_HEADER_SIZE:
+        raise ValueError("Зашифрованное сообщение обрезано!")
+    kdf, salt, nonce, check = struct.unpack(CRYPTO_HEADER_FORMAT, header)
+    enc_key, mac_key = derive_keys(password, salt, kdf)
+    if not hmac.compare_digest(check, _key_check(mac_key, nonce)):
+        raise ValueError("Неверный пароль!")
+
+    body = length - CRYPTO_HEADER_SIZE
+    count = -(-body // (CHUNK_SIZE + TAG_SIZE))
+    received = 0
+    for index, chunk in enumerate(chunks):
+        received += len(chunk)
+        ciphertext, tag = chunk[:-TAG_SIZE], chunk[-TAG_SIZE:]
+        expected = _tag(mac_key, nonce, index, index == count - 1, ciphertext)
+        if len(chunk) < TAG_SIZE or not hmac.compare_digest(tag, expected):
+            raise ValueError("Сообщение повреждено или изменено!")
+        yield _apply_keystream(enc_key, nonce, index, ciphertext)
+        if received >= body:
+            return
+    raise ValueError("Зашифрованное сообщение обрезано!")
@@ -0,0 +1,136 @@
+"""Помехоустойчивое кодирование сообщений для методов с ошибками в битах (эхо, фаза).
+
+Каждый полубайт кодируется расширенным кодом Хэмминга (8, 4): кодовое слово занимает байт,
+одна ошибка в слове исправляется, две — обнаруживаются. Кодирование и декодирование —
+выборка из таблиц на 16 и 256 значений. Биты кодовых слов перемежаются по всему блоку
+(i-й бит слова k стоит на позиции i * n + k), поэтому пачка ошибок подряд (испорченный
+фрейм или сегмент) распределяется по разным словам.
+
+Кадр: закодированная длина сообщения (4 байта) LENGTH_COPIES раз подряд, затем закодированное
+сообщение. Копии длины сводятся побитовым большинством до декодирования, поэтому длина
+переживает и пачку ошибок в одной копии, и одиночные ошибки в нескольких. Если длина
+известна заранее, тело декодируется по ней, а записанная длина только сверяется.
+"""
+import struct
+
+import numpy as np
+
+# Порождающая матрица расширенного кода Хэмминга [8, 4, 4]
+GENERATOR = np.array([
+    [1, 1, 1, 0, 0, 0, 0, 1],
+    [1, 0, 0, 1, 1, 0, 0, 1],
+    [0, 1, 0, 1, 0, 1, 0, 1],
+    [1, 1, 0, 1, 0, 0, 1, 0]
+], dtype=np.uint8)
+
+STATUS_OK, STATUS_CORRECTED, STATUS_UNCORRECTABLE = 0, 1, 2
+
+LENGTH_FORMAT = ">I"
+LENGTH_SIZE = struct.calcsize(LENGTH_FORMAT)
+# Число копий закодированной длины в начале кадра (нечётное — для голосования большинством)
+LENGTH_COPIES = 3
+
+
+def _build_tables():
+    nibbles = np.unpackbits(np.arange(16, dtype=np.uint8)[:, None], axis=1)[:, 4:]
+    encode = np.packbits(nibbles @ GENERATOR % 2, axis=1).ravel()
+    # Расстояние Хэмминга от каждого принятого байта до каждого кодового слова
+    distance = np.unpackbits((np.arange(256, dtype=np.uint8)[:, None] ^ encode[None, :])[..., None], axis=2).sum(axis=2)
+    decode = distance.argmin(axis=1).astype(np.uint8)
+    nearest = distance.min(axis=1)
+    status = np.where(nearest == 0, STATUS_OK, np.where(nearest == 1, STATUS_CORRECTED, STATUS_UNCORRECTABLE))
+    return encode, decode, status.astype(np.uint8)
+
+
+ENCODE_TABLE, DECODE_TABLE, STATUS_TABLE = _build_tables()
+
+
+def encoded_size(length):
+    """Размер закодированных данных для length байтов."""
+    return 2 * length
+
+
+def encode(data):
+    """Кодирование байтов: два кодовых слова на байт, биты перемежены по всему блоку."""
+    data = np.frombuffer(bytes(data), dtype=np.uint8)
+    codewords = ENCODE_TABLE[np.stack([data >> 4, data & 0x0F], axis=1).ravel()]
+    # Строка j — j-е (со старшего) биты всех кодовых слов
+    planes = np.empty((8, len(codewords)), dtype=np.uint8)
+    for j in range(8):
+        np.bitwise_and(codewords >> np.uint8(7 - j), 1, out=planes[j])
+    return np.packbits(planes.ravel()).tobytes()
+
+
+def decode(coded):
+    """Декодирование: (байты, отчёт с числом исправленных и неисправимых кодовых слов)."""
+    coded = np.frombuffer(bytes(coded), dtype=np.uint8)
+    count = len(coded)
+    planes = np.unpackbits(coded).reshape(8, count)
+    codewords = np.zeros(count, dtype=np.uint8)
+    for j in range(8):
+        codewords |= planes[j] << np.uint8(7 - j)
+    nibbles = DECODE_TABLE[codewords]
+    status = np.bincount(STATUS_TABLE[codewords], minlength=3)
+    data = (nibbles[0::2] << 4) | nibbles[1::2]
+    report = {
+        "symbols": count,
+        "corrected": int(status[STATUS_CORRECTED]),
+        "uncorrectable": int(status[STATUS_UNCORRECTABLE])
+    }
+    return data.tobytes(), report
+
+
+def frame_header_size():
+    """Размер копий закодированной длины в начале кадра."""
+    return LENGTH_COPIES * encoded_size(LENGTH_SIZE)
+
+
+def frame_size(length):
+    """Размер кадра для сообщения из length байтов."""
+    return frame_header_size() + encoded_size(length)
+
+
+def frame(data):
+    """Кадр: копии закодированной длины, затем закодированное сообщение."""
+    return encode(struct.pack(LENGTH_FORMAT, len(data))) * LENGTH_COPIES + encode(data)
+
+
+def _decode_length(coded_header):
+    """Длина из копий в начале кадра (побитовое большинство, затем декодер) и отчёт декодера."""
+    copies = np.frombuffer(bytes(coded_header[:frame_header_size()]), dtype=np.uint8)
+    if len(copies) < frame_header_size():
+        raise ValueError("Кадр обрезан: длина сообщения неполная!")
+    bits = np.unpackbits(copies).reshape(LENGTH_COPIES, -1)
+    majority = np.packbits(bits.sum(axis=0) > LENGTH_COPIES // 2)
+    header, report = decode(majority)
+    return struct.unpack(LENGTH_FORMAT, header)[0], report
+
+
+def frame_length(coded_header):
+    """Длина сообщения из закодированного начала кадра и отчёт декодера."""
+    length, report = _decode_length(coded_header)
+    if report["uncorrectable"]:
+        raise ValueError("Длина сообщения повреждена сильнее, чем может исправить код!")
+    return length, report
+
+
+def unframe(coded, length=None):
+    """Сообщение из кадра и суммарный отчёт декодера.
+
+    length — известная длина сообщения: тело декодируется по ней, а записанная в кадре длина
+    только сверяется (в отчёте length_mismatch). Без length используется записанная длина.
+    """
+    if length is None:
+        length, header_report = frame_length(coded)
+        mismatch = False
+    else:
+        header_length, header_report = _decode_length(coded)
+        mismatch = header_length != length
+    body = coded[frame_header_size():frame_header_size() + encoded_size(length)]
+    if len(body) < encoded_size(length):
+        raise ValueError("Кадр обрезан: сообщение неполное!")
+    data, report = decode(body)
+    for key in ("symbols", "corrected", "uncorrectable"):
+        report[key] += header_report[key]
+    report["length_mismatch"] = mismatch
+    return data, report
@@ -0,0 +1,122 @@
+"""Очередь фоновых задач GUI: ограниченный пул потоков и потокобезопасная очередь событий.
+
+Задача выполняется в потоке пула и общается с интерфейсом только через события
+("log", "progress", "done", "failed", "cancelled"), которые главный поток Tk забирает
+методом poll() по таймеру root.after(). Виджеты из рабочих потоков не трогаются.
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 2
+# Событие прогресса отправляется, только если процент вырос хотя бы на столько
+PROGRESS_STEP = 1.0
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем."""
+
+
+class Job:
+    """Одна фоновая задача. Передаётся в функцию задачи для логов, прогресса и проверки отмены."""
+
+    def __init__(self, job_id, name, events, on_done=None):
+        self.id = job_id
+        self.name = name
+        self.on_done = on_done
+        self.status = "queued"
+        self.stage = None
+        self.percent = 0.0
+        self.elapsed = 0.0
+        self._events = events
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Прерывание задачи, если её отменили."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def log(self, message):
+        self._events.put(("log", self, message))
+
+    def progress(self, stage, done, total):
+        """Обратный вызов прогресса блочных операций (service, metrics): этап и доля выполненного."""
+        self.check()
+        percent = 100.0 * done / total if total else 100.0
+        if stage != self.stage or percent - self.percent >= PROGRESS_STEP or done >= total:
+            self.stage, self.percent = stage, percent
+            self._events.put(("progress", self, stage))
+
+
+class JobManager:
+    """Пул из max_workers потоков; лишние задачи ждут своей очереди."""
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.events = queue.Queue()
+        self.jobs = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, name, func, on_done=None):
+        """Постановка func(job) в очередь; on_done(job, result) вызывается из poll() в главном потоке."""
+        job = Job(next(self._ids), name, self.events, on_done)
+        self.jobs[job.id] = job
+        self.executor.submit(self._run, job, func)
+        return job
+
+    def _run(self, job, func):
+        if job.cancelled:
+            self.events.put(("cancelled", job, None))
+            return
+        job.status = "running"
+        self.events.put(("progress", job, None))
+        start_time = time.time()
+        try:
+            result = func(job)
+            job.check()
+        except JobCancelled:
+            event = ("cancelled", job, None)
+        except Exception as e:
+            event = ("failed", job, e)
+        else:
+            event = ("done", job, result)
+        job.elapsed = time.time() - start_time
+        self.events.put(event)
+
+    def poll(self, limit=500):
+        """События, накопившиеся с прошлого вызова (не больше limit), для обработки в главном потоке.
+
+        Для завершившихся задач выставляется статус, для успешных вызывается on_done.
+        """
+        events = []
+        for _ in range(limit):
+            try:
+                kind, job, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind in ("done", "failed", "cancelled"):
+                job.status = kind
+                if kind == "done" and job.on_done is not None:
+                    job.on_done(job, value)
+            events.append((kind, job, value))
+        return events
+
+    def cancel(self, job_ids=None):
+        """Отмена задач job_ids (по умолчанию всех незавершённых)."""
+        for job_id in self.jobs if job_ids is None else job_ids:
+            job = self.jobs.get(job_id)
+            if job is not None and job.status in ("queued", "running"):
+                job.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,18 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
-import time
-import threading
-import wave
-import numpy as np
-from service import hide_message, extract_message, INPUT_DIR, OUTPUT_DIR, get_wav_info, read_txt_file
+from jobs import JobManager
+from metrics import compare_wav_files
+from service import INPUT_DIR, OUTPUT_DIR, get_wav_info, read_txt_file
+from capacity import HeaderIndex
+from resultcache import ResultCache
+from methods import ENCODERS, get_encoder
 
 class SteganographyApp:
     def __init__(self, root):
         self.root = root
         self.root.title("WAV Steganography")
-        self.root.geometry("700x600")
+        self.root.geometry("700x760")
         self.root.configure(bg="#F5F5F5")
 
         style = ttk.Style()
@@ -30,19 +31,41 @@ class SteganographyApp:
         self.message_entry = ttk.Entry(main_frame, width=50)
         self.message_entry.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0, 10))
 
+        # Пароль: шифрование сообщения (только для LSB)
+        ttk.Label(main_frame, text="Password (optional):").grid(row=0, column=2, sticky="w", pady=(0, 5))
+        self.password_entry = ttk.Entry(main_frame, width=20, show="*")
+        self.password_entry.grid(row=1, column=2, sticky="ew", pady=(0, 10), padx=(5, 0))
+
         # Кнопка выбора текстового файла
         ttk.Button(main_frame, text="Select TXT File", command=self.select_txt_file).grid(row=2, column=0, pady=10)
         self.txt_file_label = ttk.Label(main_frame, text="No text file selected", font=("Helvetica", 9, "italic"))
         self.txt_file_label.grid(row=2, column=1, sticky="w", pady=10)
 
+        # Ключ рассеивания сообщения по файлу (только для LSB). Отдельно от пароля: перестановка
+        # выводится из ключа без соли, и по ней пароль можно было бы подбирать в обход scrypt
+        key_frame = ttk.Frame(main_frame)
+        key_frame.grid(row=2, column=2, sticky="w", pady=10)
+        ttk.Label(key_frame, text="Key:").pack(side="left", padx=(0, 5))
+        self.key_entry = ttk.Entry(key_frame, width=14, show="*")
+        self.key_entry.pack(side="left")
+
         # Выбор количества битов
         ttk.Label(main_frame, text="Bits to Replace:").grid(row=3, column=0, sticky="w", pady=(0, 5))
         self.bits_combobox = ttk.Combobox(main_frame, values=[1, 2, 3, 4, 5, 6, 7, 8], state="readonly", width=5)
         self.bits_combobox.set(1)
         self.bits_combobox.grid(row=3, column=1, sticky="w", pady=(0, 10))
 
-        # Кнопка выбора WAV-файла
-        ttk.Button(main_frame, text="Select WAV File", command=self.select_file).grid(row=4, column=0, pady=10)
+        # Выбор метода стеганографии
+        method_frame = ttk.Frame(main_frame)
+        method_frame.grid(row=3, column=2, sticky="w", pady=(0, 10))
+        ttk.Label(method_frame, text="Method:").pack(side="left", padx=(0, 5))
+        self.method_combobox = ttk.Combobox(method_frame, values=list(ENCODERS), state="readonly", width=12)
+        self.method_combobox.set("lsb")
+        self.method_combobox.pack(side="left")
+        self.method_combobox.bind("<<ComboboxSelected>>", self.on_method_selected)
+
+        # Кнопка выбора WAV-файлов (можно несколько — каждый обрабатывается отдельной задачей)
+        ttk.Button(main_frame, text="Select WAV Files", command=self.select_file).grid(row=4, column=0, pady=10)
         self.selected_file_label = ttk.Label(main_frame, text="No file selected", font=("Helvetica", 9, "italic"))
         self.selected_file_label.grid(row=4, column=1, sticky="w", pady=10)
 
@@ -51,11 +74,25 @@ class SteganographyApp:
         ttk.Button(main_frame, text="Decrypt", command=self.decrypt).grid(row=5, column=1, pady=10, padx=5)
         ttk.Button(main_frame, text="Analyze Difference", command=self.analyze_difference).grid(row=5, column=2, pady=10, padx=5)
 
+        # Очередь задач: файл, действие, прогресс, статус
+        jobs_header = ttk.Frame(main_frame)
+        jobs_header.grid(row=6, column=0, columnspan=3, sticky="ew", pady=(10, 5))
+        ttk.Label(jobs_header, text="Jobs:").pack(side="left")
+        ttk.Button(jobs_header, text="Cancel All", command=self.cancel_all_jobs).pack(side="right", padx=(5, 0))
+        ttk.Button(jobs_header, text="Cancel Selected", command=self.cancel_selected_jobs).pack(side="right")
+        self.jobs_tree = ttk.Treeview(main_frame, columns=("file", "action", "progress", "status"),
+                                      show="headings", height=4)
+        for column, title, width in (("file", "File", 260), ("action", "Action", 90),
+                                     ("progress", "Progress", 120), ("status", "Status", 90)):
+            self.jobs_tree.heading(column, text=title)
+            self.jobs_tree.column(column, width=width, anchor="w")
+        self.jobs_tree.grid(row=7, column=0, columnspan=3, sticky="nsew")
+
         # Поле вывода логов
-        ttk.Label(main_frame, text="Logs:").grid(row=6, column=0, sticky="w", pady=(10, 5))
-        self.log_text = tk.Text(main_frame, height=15, width=80, bg="#FFF8E7", fg="#4A4A4A", 
+        ttk.Label(main_frame, text="Logs:").grid(row=8, column=0, sticky="w", pady=(10, 5))
+        self.log_text = tk.Text(main_frame, height=12, width=80, bg="#FFF8E7", fg="#4A4A4A", 
                                font=("Helvetica", 10), borderwidth=0, relief="flat")
-        self.log_text.grid(row=7, column=0, columnspan=3, sticky="nsew")
+        self.log_text.grid(row=9, column=0, columnspan=3, sticky="nsew")
         
         # Настройка возможности копирования текста
         self.log_text.configure(state="normal")  # Разрешаем редактирование для копирования
@@ -67,22 +104,22 @@ class SteganographyApp:
         
         # Добавляем скроллбар для удобства
         scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.log_text.yview)
-        scrollbar.grid(row=7, column=3, sticky="ns")
+        scrollbar.grid(row=9, column=3, sticky="ns")
         self.log_text.configure(yscrollcommand=scrollbar.set)
 
         # Время выполнения
-        ttk.Label(main_frame, text="Execution Time:").grid(row=8, column=0, sticky="w", pady=(10, 5))
+        ttk.Label(main_frame, text="Execution Time:").grid(row=10, column=0, sticky="w", pady=(10, 5))
         self.time_label = ttk.Label(main_frame, text="0.00 sec", font=("Helvetica", 9))
-        self.time_label.grid(row=8, column=1, sticky="w")
+        self.time_label.grid(row=10, column=1, sticky="w")
 
         # Кнопки Clear и Exit
-        ttk.Button(main_frame, text="Clear", command=self.clear_logs).grid(row=9, column=0, pady=10, padx=5)
-        ttk.Button(main_frame, text="Exit", command=self.root.quit).grid(row=9, column=1, pady=10, padx=5)
+        ttk.Button(main_frame, text="Clear", command=self.clear_logs).grid(row=11, column=0, pady=10, padx=5)
+        ttk.Button(main_frame, text="Exit", command=self.exit).grid(row=11, column=1, pady=10, padx=5)
 
         # Описание программы и GitHub
         footer_frame = ttk.Frame(main_frame, style="Footer.TFrame")
         style.configure("Footer.TFrame", background="#EDE4D3")
-        footer_frame.grid(row=10, column=0, columnspan=3, pady=10, sticky="ew")
+        footer_frame.grid(row=12, column=0, columnspan=3, pady=10, sticky="ew")
         description = (
             "Инструмент волновой стеганографии с использованием LSB.\n"
             "GitHub: https://github.com/Vesimeu"
@@ -90,14 +127,22 @@ class SteganographyApp:
         ttk.Label(footer_frame, text=description, justify="center", font=("Helvetica", 9), foreground="#4A4A4A", background="#EDE4D3").pack()
 
         main_frame.columnconfigure(0, weight=1)
-        main_frame.rowconfigure(7, weight=1)
+        main_frame.rowconfigure(9, weight=1)
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
 
-        self.selected_file = None
+        self.selected_files = []
         self.txt_file = None
-        self.encoded_file = None
-        self.loading_window = None
+        # Исходный файл -> результат встраивания (путь, метод, параметры, длина сообщения)
+        self.encoded = {}
+        # Файл результата -> задача, которая его пишет
+        self.output_jobs = {}
+        self.header_index = HeaderIndex()
+        # Результаты извлечения и анализа по содержимому файлов (общий для всех задач)
+        self.result_cache = ResultCache()
+        self.job_manager = JobManager()
+        self.root.protocol("WM_DELETE_WINDOW", self.exit)
+        self.process_job_events()
 
     def log(self, message):
         # Вывод в интерфейс
@@ -107,38 +152,100 @@ class SteganographyApp:
         # Вывод в терминал
         print(message)
 
-    def show_loading(self, message):
-        self.loading_window = tk.Toplevel(self.root)
-        self.loading_window.title("Processing")
-        self.loading_window.geometry("300x100")
-        self.loading_window.configure(bg="#F5F5F5")
-        self.loading_window.transient(self.root)
-        self.loading_window.grab_set()
+    def on_method_selected(self, event=None):
+        """Пароль и ключ есть только у LSB: для других методов поля очищаются и отключаются."""
+        for entry in (self.password_entry, self.key_entry):
+            if self.method_combobox.get() == "lsb":
+                entry.config(state="normal")
+            else:
+                entry.delete(0, tk.END)
+                entry.config(state="disabled")
+
+    def get_method_options(self):
+        """Выбранный метод и параметры для get_encoder() (читаются из виджетов в главном потоке)."""
+        method = self.method_combobox.get()
+        if method == "lsb":
+            return method, self.get_lsb_options()
+        return method, {}
+
+    def get_lsb_options(self):
+        return {"num_bits": int(self.bits_combobox.get()), "key": self.key_entry.get() or None,
+                "password": self.password_entry.get() or None}
+
+    def make_encoder(self, method, options, job=None):
+        """Экземпляр метода; для LSB прогресс блоков передаётся в задачу job, а отпечатки — в кэш."""
+        if method == "lsb" and job is not None:
+            return get_encoder(method, progress=job.progress, result_cache=self.result_cache, **options)
+        return get_encoder(method, **options)
+
+    def process_job_events(self):
+        """Обработка событий фоновых задач в главном потоке Tk (по таймеру)."""
+        for kind, job, value in self.job_manager.poll():
+            if kind == "log":
+                self.log(value)
+                continue
+            if kind == "failed":
+                self.log(f"{job.name} Error: {value}")
+            elif kind == "cancelled":
+                self.log(f"{job.name}: cancelled")
+            self.update_job_row(job)
+            if kind != "progress":
+                self.time_label.config(text=f"{job.elapsed:.2f} sec")
+        self.root.after(100, self.process_job_events)
+
+    def submit_job(self, name, path, func, on_done=None):
+        """Задача func(job) над файлом path: строка в таблице задач и постановка в очередь."""
+        job = self.job_manager.submit(name, func, on_done)
+        self.jobs_tree.insert("", tk.END, iid=str(job.id), values=(os.path.basename(path), name, "", job.status))
+        return job
+
+    def update_job_row(self, job):
+        if job.status == "done":
+            progress = "100%"
+        elif job.stage is None:
+            progress = ""
+        else:
+            progress = f"{job.stage} {job.percent:.0f}%"
+        if self.jobs_tree.exists(str(job.id)):
+            self.jobs_tree.set(str(job.id), "progress", progress)
+            self.jobs_tree.set(str(job.id), "status", job.status)
 
-        ttk.Label(self.loading_window, text=message, foreground="#4A4A4A").pack(pady=20)
-        progress = ttk.Progressbar(self.loading_window, mode="indeterminate")
-        progress.pack(pady=10)
-        progress.start()
+    def cancel_selected_jobs(self):
+        self.job_manager.cancel([int(iid) for iid in self.jobs_tree.selection()])
 
-    def hide_loading(self):
-        if self.loading_window:
-            self.loading_window.destroy()
-            self.loading_window = None
+    def cancel_all_jobs(self):
+        self.job_manager.cancel()
+
+    def exit(self):
+        self.job_manager.shutdown()
+        self.root.quit()
 
     def select_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("WAV files", "*.wav")])
-        if file_path:
-            self.selected_file = file_path
-            self.selected_file_label.config(text=os.path.basename(file_path))
-            info = get_wav_info(file_path)
-            num_bits = int(self.bits_combobox.get())
-            available_chars = (info['total_samples'] * num_bits) // 8
+        file_paths = filedialog.askopenfilenames(filetypes=[("WAV files", "*.wav")])
+        if not file_paths:
+            return
+        self.selected_files = list(file_paths)
+        label = os.path.basename(file_paths[0])
+        if len(file_paths) > 1:
+            label += f" (+{len(file_paths) - 1})"
+        self.selected_file_label.config(text=label)
+        method, options = self.get_method_options()
+        encoder = self.make_encoder(method, options)
+        for file_path in file_paths:
+            params = self.header_index.get(file_path)
+            info = get_wav_info(file_path, params)
+            available_chars = encoder.capacity(params)
             self.log(f"File Info: {os.path.basename(file_path)}")
             self.log(f"  Samples: {info['total_samples']}")
             self.log(f"  Bits: {info['total_bits']}")
-            self.log(f"  Available Characters (for {num_bits} bits): {available_chars}")
+            self.log(f"  Available Bytes (UTF-8, for {self.describe_method(encoder)}): {available_chars}")
             self.log(f"  Channels: {info['nchannels']}, Rate: {info['framerate']} Hz, Duration: {info['duration']:.2f} sec")
 
+    def describe_method(self, encoder):
+        if encoder.name == "lsb":
+            return f"{encoder.num_bits} bits"
+        return f"method {encoder.name}"
+
     def select_txt_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt")])
         if file_path:
@@ -156,7 +263,7 @@ class SteganographyApp:
             return "Заметные искажения"
 
     def encrypt(self):
-        if not self.selected_file:
+        if not self.selected_files:
             messagebox.showerror("Error", "Please select a WAV file!")
             return
 
@@ -174,105 +281,127 @@ class SteganographyApp:
                 return
 
         num_bits = int(self.bits_combobox.get())
-        self.time_label.config(text="0.00 sec")
-        self.show_loading("Encrypting...")
-        self.encoded_file = os.path.join(OUTPUT_DIR, f"encoded_bits{num_bits}_{os.path.basename(self.selected_file)}")
-
-        def encrypt_thread():
-            start_time = time.time()
-            try:
-                if not os.path.exists(OUTPUT_DIR):
-                    os.makedirs(OUTPUT_DIR)
-                stats = hide_message(self.selected_file, self.encoded_file, message, num_bits)
-                self.log(f"Encrypted to: {os.path.basename(self.encoded_file)}")
-                self.log(f"Max sample difference: {stats['max_diff']}")
-                self.log(f"Mean sample difference: {stats['mean_diff']:.2f}")
-                self.log(f"SNR: {stats['snr']:.2f} dB")
-                self.log(f"Changed samples: {stats['changed_samples']} ({stats['changed_percent']:.2f}%)")
-                self.log(f"Quality assessment: {self.get_quality_assessment(stats['snr'], stats['changed_percent'], num_bits)}")
-
-                info = get_wav_info(self.encoded_file)
-                self.log(f"Encrypted File Info: {os.path.basename(self.encoded_file)}")
-                self.log(f"  Samples: {info['total_samples']}")
-                self.log(f"  Bits: {info['total_bits']}")
-                self.log(f"  Available Characters (for {num_bits} bits): {stats['available_chars']}")
-            except Exception as e:
-                self.log(f"Encryption Error: {e}")
-            finally:
-                elapsed_time = time.time() - start_time
-                self.root.after(0, lambda: self.time_label.config(text=f"{elapsed_time:.2f} sec"))
-                self.root.after(0, self.hide_loading)
-
-        threading.Thread(target=encrypt_thread, daemon=True).start()
+        method, options = self.get_method_options()
+        prefix = f"bits{num_bits}" if method == "lsb" else method
+        if not os.path.exists(OUTPUT_DIR):
+            os.makedirs(OUTPUT_DIR)
+        for input_file in self.selected_files:
+            output_file = os.path.join(OUTPUT_DIR, f"encoded_{prefix}_{os.path.basename(input_file)}")
+            # Две задачи не пишут в один файл одновременно
+            writer = self.output_jobs.get(output_file)
+            if writer is not None and writer.status in ("queued", "running"):
+                self.log(f"{os.path.basename(output_file)} is already being written, skipped")
+                continue
+
+            def run(job, input_file=input_file, output_file=output_file):
+                return self.encrypt_job(job, method, options, input_file, output_file, message, num_bits)
+
+            def remember(job, result, input_file=input_file):
+                self.encoded[input_file] = result
+
+            self.output_jobs[output_file] = self.submit_job("Encrypt", input_file, run, on_done=remember)
+
+    def encrypt_job(self, job, method, options, input_file, output_file, message, num_bits):
+        """Встраивание в рабочем потоке: логи только через job.log."""
+        encoder = self.make_encoder(method, options, job)
+        try:
+            stats = encoder.embed(input_file, output_file, message)
+            job.check()
+        except Exception:
+            # Отменённое или неудачное встраивание не оставляет недописанный файл
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            raise
+        job.log(f"Encrypted to: {os.path.basename(output_file)}")
+        job.log(f"Max sample difference: {stats['max_diff']}")
+        job.log(f"Mean sample difference: {stats['mean_diff']:.2f}")
+        job.log(f"SNR: {stats['snr']:.2f} dB")
+        job.log(f"Segmental SNR: {stats['segmental_snr']:.2f} dB")
+        job.log(f"Changed samples: {stats['changed_samples']} ({stats['changed_percent']:.2f}%)")
+        if "codec" in stats:
+            job.log(f"Compression: {stats['codec']}, {stats['payload_bytes']} -> {stats['stored_bytes']} bytes "
+                    f"({stats['compress_time']:.2f} sec)")
+        job.log(f"Quality assessment: {self.get_quality_assessment(stats['snr'], stats['changed_percent'], num_bits)}")
+
+        info = get_wav_info(output_file)
+        job.log(f"Encrypted File Info: {os.path.basename(output_file)}")
+        job.log(f"  Samples: {info['total_samples']}")
+        job.log(f"  Bits: {info['total_bits']}")
+        job.log(f"  Available Bytes (UTF-8, for {self.describe_method(encoder)}): {stats['available_chars']}")
+        return {"output": output_file, "method": method, "options": options, "length": len(message.encode('utf-8') if isinstance(message, str) else message)}
+
+    def get_encoded(self):
+        """Результаты встраивания для выбранных файлов (в порядке выбора)."""
+        return [(input_file, self.encoded[input_file]) for input_file in self.selected_files if input_file in self.encoded]
 
     def decrypt(self):
-        if not self.encoded_file:
+        encoded = self.get_encoded()
+        if not encoded:
             messagebox.showerror("Error", "Encrypt a file first!")
             return
 
-        num_bits = int(self.bits_combobox.get())
-        self.time_label.config(text="0.00 sec")
-        self.show_loading("Decrypting...")
-
-        def decrypt_thread():
-            start_time = time.time()
-            try:
-                extracted = extract_message(self.encoded_file, num_bits)
-                self.log(f"Decrypted Message from {os.path.basename(self.encoded_file)}: {extracted[:100]}...")
-            except Exception as e:
-                self.log(f"Decryption Error: {e}")
-            finally:
-                elapsed_time = time.time() - start_time
-                self.root.after(0, lambda: self.time_label.config(text=f"{elapsed_time:.2f} sec"))
-                self.root.after(0, self.hide_loading)
-
-        threading.Thread(target=decrypt_thread, daemon=True).start()
+        for _, result in encoded:
+            # Извлечение тем же методом, которым файл был зашифрован
+            method, options = result["method"], result["options"]
+            if method == "lsb":
+                # Число битов и пароль берутся из текущего выбора (число битов сверяется с заголовком)
+                options = self.get_lsb_options()
+            self.submit_job("Decrypt", result["output"],
+                            lambda job, result=result, method=method, options=options:
+                            self.decrypt_job(job, method, options, result["output"], result["length"]))
+
+    def extract_cache_key(self, method, options, encoded_file, message_length):
+        """Ключ результата извлечения в кэше; None для сообщений с паролем (текст не хранится на диске)
+        и для методов, читающих часть файла, если его отпечаток ещё не известен."""
+        if options.get("password") is not None:
+            return None
+        if not ENCODERS[method].needs_length:
+            message_length = None
+        if ENCODERS[method].partial_read:
+            digest = self.result_cache.known_digest(encoded_file)
+            if digest is None:
+                return None
+        else:
+            digest = self.result_cache.file_digest(encoded_file)
+        return ResultCache.make_key("extract", [digest], method=method, message_length=message_length, **options)
+
+    def decrypt_job(self, job, method, options, encoded_file, message_length):
+        cache_key = self.extract_cache_key(method, options, encoded_file, message_length)
+        extracted = self.result_cache.get(cache_key) if cache_key is not None else None
+        cached = extracted is not None
+        if not cached:
+            extracted = self.make_encoder(method, options, job).extract(encoded_file, message_length)
+            if extracted is None:
+                raise ValueError("Message not found!")
+            if cache_key is not None:
+                self.result_cache.put(cache_key, extracted)
+        job.log(f"Decrypted Message from {os.path.basename(encoded_file)}{' (cached)' if cached else ''}: "
+                f"{extracted[:100]}...")
 
     def analyze_difference(self):
-        if not self.selected_file or not self.encoded_file:
+        encoded = self.get_encoded()
+        if not encoded:
             messagebox.showerror("Error", "Select both original and encrypted files!")
             return
 
-        self.time_label.config(text="0.00 sec")
-        self.show_loading("Analyzing...")
-
-        def analyze_thread():
-            start_time = time.time()
-            try:
-                with wave.open(self.selected_file, 'rb') as wav_orig:
-                    frames_orig = wav_orig.readframes(wav_orig.getnframes())
-                    samples_orig = np.frombuffer(frames_orig, dtype=np.int16)
-
-                with wave.open(self.encoded_file, 'rb') as wav_enc:
-                    frames_enc = wav_enc.readframes(wav_enc.getnframes())
-                    samples_enc = np.frombuffer(frames_enc, dtype=np.int16)
-
-                if len(samples_orig) != len(samples_enc):
-                    raise ValueError("Files have different lengths!")
-
-                max_diff = np.max(np.abs(samples_enc - samples_orig))
-                mean_diff = np.mean(np.abs(samples_enc - samples_orig))
-                signal_power = np.mean(samples_orig.astype(np.float64) ** 2)
-                noise_power = np.mean((samples_enc - samples_orig).astype(np.float64) ** 2)
-                snr = 10 * np.log10(signal_power / noise_power) if noise_power > 0 else float('inf')
-                changed_samples = np.sum(samples_enc != samples_orig)
-                changed_percent = (changed_samples / len(samples_orig)) * 100 if len(samples_orig) > 0 else 0
-
-                num_bits = int(self.bits_combobox.get())
-                self.log(f"Analysis of {os.path.basename(self.selected_file)} vs {os.path.basename(self.encoded_file)}:")
-                self.log(f"  Max sample difference: {max_diff}")
-                self.log(f"  Mean sample difference: {mean_diff:.2f}")
-                self.log(f"  SNR: {snr:.2f} dB")
-                self.log(f"  Changed samples: {changed_samples} ({changed_percent:.2f}%)")
-                self.log(f"  Quality assessment: {self.get_quality_assessment(snr, changed_percent, num_bits)}")
-            except Exception as e:
-                self.log(f"Analysis Error: {e}")
-            finally:
-                elapsed_time = time.time() - start_time
-                self.root.after(0, lambda: self.time_label.config(text=f"{elapsed_time:.2f} sec"))
-                self.root.after(0, self.hide_loading)
-
-        threading.Thread(target=analyze_thread, daemon=True).start()
+        num_bits = int(self.bits_combobox.get())
+        for input_file, result in encoded:
+            self.submit_job("Analyze", result["output"],
+                            lambda job, input_file=input_file, encoded_file=result["output"]:
+                            self.analyze_job(job, input_file, encoded_file, num_bits))
+
+    def analyze_job(self, job, input_file, encoded_file, num_bits):
+        stats = compare_wav_files(input_file, encoded_file, progress=job.progress, result_cache=self.result_cache)
+        snr = stats['snr']
+        changed_percent = stats['changed_percent']
+
+        job.log(f"Analysis of {os.path.basename(input_file)} vs {os.path.basename(encoded_file)}:")
+        job.log(f"  Max sample difference: {stats['max_diff']}")
+        job.log(f"  Mean sample difference: {stats['mean_diff']:.2f}")
+        job.log(f"  SNR: {snr:.2f} dB")
+        job.log(f"  Segmental SNR: {stats['segmental_snr']:.2f} dB")
+        job.log(f"  Changed samples: {stats['changed_samples']} ({changed_percent:.2f}%)")
+        job.log(f"  Quality assessment: {self.get_quality_assessment(snr, changed_percent, num_bits)}")
 
     def clear_logs(self):
         self.log_text.delete(1.0, tk.END)
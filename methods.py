@@ -0,0 +1,268 @@
+"""Реестр методов стеганографии с общим интерфейсом Encoder.
+
+Каждый метод умеет считать ёмкость по заголовку WAV (capacity), встраивать сообщение (embed)
+и извлекать его (extract). Методы, работающие с сигналом (эхо, фаза), получают буфер сэмплов
+float64: чтение через np.memmap, запись WAV и статистика изменений общие для всех методов.
+GUI, консольный режим (cli) и бенчмарк выбирают метод по имени через get_encoder().
+Сигнальные методы с fec=True защищают сообщение помехоустойчивым кодом (fec.py).
+"""
+from abc import ABC, abstractmethod
+
+import fec
+from metrics import compare_samples, compare_wav_files
+from service import hide_message, extract_message, lsb_capacity
+from wavmap import read_wav_header, read_frames, write_pcm16
+
+# Имя метода -> класс (в порядке регистрации)
+ENCODERS = {}
+
+# Формат сэмплов, в котором сигнальные методы пишут результат
+PCM16 = {"format": "int", "sampwidth": 2}
+
+
+def register(cls):
+    """Регистрация метода под именем cls.name (используется как декоратор класса)."""
+    ENCODERS[cls.name] = cls
+    return cls
+
+
+def get_encoder(name, **options):
+    """Экземпляр метода name с параметрами options."""
+    if name not in ENCODERS:
+        raise ValueError(f"Неизвестный метод: {name}")
+    return ENCODERS[name](**options)
+
+
+class Encoder(ABC):
+    """Общий интерфейс метода стеганографии (метод без capacity/embed/extract не создаётся)."""
+
+    name = None
+    # Метод не хранит длину сообщения — при извлечении её нужно передать явно
+    needs_length = False
+    # Извлечение читает только часть файла: отпечаток всего файла ради кэша дороже самого извлечения
+    partial_read = False
+
+    @abstractmethod
+    def capacity(self, params):
+        """Максимальная длина сообщения по заголовку WAV (read_wav_header)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def embed(self, input_wav_path, output_wav_path, message):
+        """Встраивание сообщения; возвращает статистику изменений (как hide_message)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def extract(self, input_wav_path, message_length=None):
+        """Извлечение сообщения."""
+        raise NotImplementedError
+
+    def extract_with_report(self, input_wav_path, message_length=None):
+        """Извлечение сообщения и отчёт декодера FEC (пустой, если метод без FEC)."""
+        return self.extract(input_wav_path, message_length), {}
+
+
+@register
+class LSBEncoder(Encoder):
+    """LSB с заголовком контейнера (service.hide_message / extract_message)."""
+
+    name = "lsb"
+    partial_read = True
+
+    def __init__(self, num_bits=None, channels=None, trace=None, key=None, password=None, compression="auto",
+                 progress=None, result_cache=None):
+        # num_bits=None: при встраивании 1 бит, при извлечении — из заголовка
+        self.num_bits = num_bits
+        self.channels = channels
+        self.trace = trace
+        self.key = key
+        self.password = password
+        self.compression = compression
+        # progress(этап, сделано, всего) после каждого блока (service.hide_message / extract_message)
+        self.progress = progress
+        # resultcache.ResultCache для отпечатков и метрик встраивания (service.hide_message)
+        self.result_cache = result_cache
+
+    def capacity(self, params):
+        return lsb_capacity(params, self.num_bits or 1, self.channels)
+
+    def embed(self, input_wav_path, output_wav_path, message):
+        return hide_message(input_wav_path, output_wav_path, message, self.num_bits or 1,
+                            trace=self.trace, channels=self.channels, key=self.key, password=self.password,
+                            compression=self.compression, progress=self.progress,
+                            result_cache=self.result_cache)
+
+    def extract(self, input_wav_path, message_length=None):
+        return extract_message(input_wav_path, self.num_bits, trace=self.trace, channels=self.channels,
+                               key=self.key, password=self.password, progress=self.progress)
+
+
+@register
+class LSBResearchEncoder(Encoder):
+    """Исследовательский LSB (research/lsb_stego.py): 1 бит на сэмпл, текст в UTF-8, конец — байт '\\0'."""
+
+    name = "lsb-research"
+
+    def __init__(self, trace=None):
+        from research.lsb_stego import LSBSteganography
+        self.coder = LSBSteganography(trace)
+
+    def capacity(self, params):
+        return self.coder.capacity(params["nframes"] * params["nchannels"])
+
+    def embed(self, input_wav_path, output_wav_path, message):
+        self.coder.hide_message(input_wav_path, output_wav_path, message)
+        return {**compare_wav_files(input_wav_path, output_wav_path),
+                "available_chars": self.capacity(read_wav_header(input_wav_path))}
+
+    def extract(self, input_wav_path, message_length=None):
+        return self.coder.extract_message(input_wav_path)
+
+
+def _decode_text(data):
+    """Текст из байтов UTF-8 (ошибки декодирования сигнала заменяются символом U+FFFD)."""
+    return None if data is None else data.decode('utf-8', errors='replace')
+
+
+class SignalEncoder(Encoder):
+    """Метод над сигналом одного канала: общее чтение, запись 16-битного WAV и статистика.
+
+    Наследники задают signal_capacity(params) в байтах, embed_samples(signal, data) и
+    extract_samples(signal, length), работающие с байтами. Текст встраивается в UTF-8 и
+    извлекается как str. С fec=True в сигнал встраивается кадр fec.frame(), а ёмкость
+    уменьшается на размер кода. Результат сохраняет каналы
+    исходного файла (_unmix), поэтому его можно сравнивать с исходным compare_wav_files.
+    """
+
+    fec = False
+
+    @abstractmethod
+    def signal_capacity(self, params):
+        """Ёмкость сигнала в байтах по заголовку WAV."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def embed_samples(self, signal, data):
+        """Сигнал со встроенными байтами data."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def extract_samples(self, signal, length):
+        """length байт из сигнала (None, если извлечь не удалось)."""
+        raise NotImplementedError
+
+    def _mix(self, frames):
+        """Сигнал, с которым работает метод, из матрицы (кадры, каналы)."""
+        return frames[:, 0]
+
+    def _unmix(self, frames, signal):
+        """Матрица (кадры, каналы) для записи: изменённый сигнал в канале, из которого он взят."""
+        frames = frames.copy()
+        frames[:, 0] = signal
+        return frames
+
+    def _read_frames(self, wav_path):
+        params = read_wav_header(wav_path)
+        if (params["format"], params["sampwidth"]) != (PCM16["format"], PCM16["sampwidth"]):
+            raise ValueError(f"Метод {self.name} поддерживает только 16-битный PCM!")
+        return read_frames(wav_path, params)
+
+    def _read(self, wav_path):
+        frames, params = self._read_frames(wav_path)
+        return self._mix(frames), params
+
+    def capacity(self, params):
+        available = self.signal_capacity(params)
+        if self.fec:
+            return max(0, (available - fec.frame_header_size()) // fec.encoded_size(1))
+        return available
+
+    def embed(self, input_wav_path, output_wav_path, message):
+        payload = message.encode('utf-8') if isinstance(message, str) else bytes(message)
+        frames, params = self._read_frames(input_wav_path)
+        signal = self._mix(frames)
+        available_chars = self.capacity(params)
+        if len(payload) > available_chars:
+            raise ValueError(f"Сообщение слишком длинное! Максимум {available_chars} байт для метода {self.name}.")
+        if self.fec:
+            payload = fec.frame(payload)
+        encoded = write_pcm16(output_wav_path, self._unmix(frames, self.embed_samples(signal, payload)),
+                              params["framerate"])
+        stats = compare_samples(frames.ravel(), encoded.ravel(), PCM16, nchannels=params["nchannels"])
+        return {**stats, "available_chars": available_chars}
+
+    def extract(self, input_wav_path, message_length=None):
+        return self.extract_with_report(input_wav_path, message_length)[0]
+
+    def extract_with_report(self, input_wav_path, message_length=None):
+        if self.needs_length and message_length is None:
+            raise ValueError(f"Для метода {self.name} нужна длина сообщения!")
+        signal, _ = self._read(input_wav_path)
+        if not self.fec:
+            return _decode_text(self.extract_samples(signal, message_length)), {}
+
+        known_length = message_length
+        if message_length is None:
+            # Длина берётся из начала кадра, затем читается весь кадр
+            header = self.extract_samples(signal, fec.frame_header_size())
+            if header is None:
+                return None, {}
+            message_length, _ = fec.frame_length(header)
+        coded = self.extract_samples(signal, fec.frame_size(message_length))
+        if coded is None:
+            return None, {}
+        # Известная длина надёжнее записанной: записанная тогда только сверяется
+        data, report = fec.unframe(coded, known_length)
+        return _decode_text(data), report
+
+
+@register
+class EchoEncoder(SignalEncoder):
+    """Эхо-кодирование (research/echo_stego.py) в первом канале."""
+
+    name = "echo"
+    needs_length = True
+
+    def __init__(self, fec=False, **coder_options):
+        from research.echo_stego import EchoHidingSteganography
+        # Корреляционный декодер на реальной записи ошибается даже в коротком тексте: по умолчанию кепстр
+        coder_options.setdefault("decoder", "cepstrum")
+        self.coder = EchoHidingSteganography(**coder_options)
+        self.fec = fec
+
+    def signal_capacity(self, params):
+        return self.coder.capacity(params["nframes"])
+
+    def embed_samples(self, signal, message):
+        return self.coder.encode_samples(signal, message)
+
+    def extract_samples(self, signal, message_length):
+        return self.coder.decode_data(signal, message_length)[0]
+
+
+@register
+class PhaseEncoder(SignalEncoder):
+    """Фазовое кодирование (research/phaze_stego.py) в среднем по каналам сигнале."""
+
+    name = "phase"
+
+    def __init__(self, segment_size=4096, fec=False):
+        from research.phaze_stego import PhaseSteganography
+        self.coder = PhaseSteganography(segment_size)
+        self.fec = fec
+
+    def _mix(self, frames):
+        return frames.mean(axis=1)
+
+    def _unmix(self, frames, signal):
+        # Разница с исходным средним добавляется в каждый канал: среднее становится изменённым сигналом
+        return frames + (signal - self._mix(frames))[:, None]
+
+    def signal_capacity(self, params):
+        return self.coder.capacity(params["nframes"])
+
+    def embed_samples(self, signal, message):
+        return self.coder.encode_samples(signal, message)
+
+    def extract_samples(self, signal, message_length):
+        return self.coder.decode_data(signal, message_length)
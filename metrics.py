@@ -0,0 +1,208 @@
+"""Потоковый расчёт качества встраивания по парам блоков (исходный, изменённый) за один проход.
+
+Суммы копятся во float64, поэтому разность не переполняется ни в одном формате сэмплов.
+Результат: max/mean |diff|, SNR, сегментный SNR и число изменённых сэмплов. Сравнения
+WAV-файлов кэшируются в памяти по паре (путь, mtime, размер) и, если передан
+resultcache.ResultCache, на диске по содержимому файлов.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from resultcache import ResultCache, new_hasher, update_hasher, file_key
+from wavmap import read_wav_header, open_samples, samples_to_float
+
+CHUNK_SAMPLES = 1 << 16
+# Сегмент для сегментного SNR (кадров) и границы SNR сегмента, дБ
+SEGMENT_FRAMES = 1024
+SEGMENT_SNR_RANGE = (-10.0, 35.0)
+# Сколько сравнений файлов хранится в кэше
+PAIR_CACHE_SIZE = 32
+
+_pair_cache = OrderedDict()
+# Сравнения запускаются из нескольких потоков (задачи GUI)
+_pair_cache_lock = threading.Lock()
+
+
+def _segment_snr(original, diff):
+    """Сумма SNR сегментов (строк матриц) в пределах SEGMENT_SNR_RANGE и число учтённых сегментов."""
+    signal = np.einsum('ij,ij->i', original, original)
+    noise = np.einsum('ij,ij->i', diff, diff)
+    # Сегменты тишины без изменений не несут информации о качестве
+    present = (signal > 0) | (noise > 0)
+    low, high = SEGMENT_SNR_RANGE
+    with np.errstate(divide='ignore'):
+        snr = np.clip(10 * np.log10(signal[present] / noise[present]), low, high)
+    return float(snr.sum()), int(present.sum())
+
+
+class QualityMetrics:
+    """Накопитель метрик: update() для каждой пары блоков, затем result().
+
+    Блоки могут быть любой длины: неполный сегмент переносится в следующий вызов.
+    """
+
+    def __init__(self, segment_samples=SEGMENT_FRAMES):
+        self.segment_samples = segment_samples
+        self.count = 0
+        self.changed = 0
+        self.max_diff = 0.0
+        self.abs_diff_sum = 0.0
+        self.signal_sum = 0.0
+        self.noise_sum = 0.0
+        self.segment_snr_sum = 0.0
+        self.segments = 0
+        self._tail = (np.zeros(0), np.zeros(0))
+
+    def update(self, original, modified):
+        """Добавление пары блоков сэмплов float64 одинаковой длины."""
+        diff = modified - original
+        self.count += len(diff)
+        if len(diff):
+            self.changed += int(np.count_nonzero(diff))
+            self.max_diff = max(self.max_diff, float(np.max(np.abs(diff))))
+            self.abs_diff_sum += float(np.sum(np.abs(diff)))
+            self.noise_sum += float(np.dot(diff, diff))
+            self.signal_sum += float(np.dot(original, original))
+        self._add_segments(original, diff)
+
+    def update_unchanged(self, original):
+        """Добавление блока, который не менялся (разность нулевая)."""
+        self.count += len(original)
+        self.signal_sum += float(np.dot(original, original))
+        self._add_segments(original, np.zeros(len(original)))
+
+    def _add_segments(self, original, diff):
+        tail_original, tail_diff = self._tail
+        if len(tail_original):
+            original = np.concatenate([tail_original, original])
+            diff = np.concatenate([tail_diff, diff])
+        whole = len(original) // self.segment_samples * self.segment_samples
+        self._tail = (original[whole:].copy(), diff[whole:].copy())
+        if whole:
+            snr_sum, segments = _segment_snr(original[:whole].reshape(-1, self.segment_samples),
+                                             diff[:whole].reshape(-1, self.segment_samples))
+            self.segment_snr_sum += snr_sum
+            self.segments += segments
+
+    def result(self, integer=False):
+        """Итоговые метрики; integer=True — max_diff целым числом (целочисленный PCM)."""
+        snr_sum, segments = self.segment_snr_sum, self.segments
+        tail_original, tail_diff = self._tail
+        if len(tail_original):
+            # Неполный последний сегмент учитывается, но не сбрасывается: update() можно продолжить
+            tail_sum, tail_segments = _segment_snr(tail_original[None, :], tail_diff[None, :])
+            snr_sum += tail_sum
+            segments += tail_segments
+
+        count = self.count
+        return {
+            "max_diff": int(self.max_diff) if integer else self.max_diff,
+            "mean_diff": self.abs_diff_sum / count if count else 0.0,
+            "snr": 10 * np.log10(self.signal_sum / self.noise_sum) if self.noise_sum > 0 else float('inf'),
+            "segmental_snr": snr_sum / segments if segments else float('inf'),
+            "changed_samples": self.changed,
+            "changed_percent": (self.changed / count) * 100 if count else 0
+        }
+
+
+def compare_samples(samples_orig, samples_enc, params, params_enc=None, changed_count=None, nchannels=None,
+                    progress=None, hashers=None):
+    """Метрики двух массивов сэмплов (np.memmap или массивы) за один проход блоками.
+
+    params / params_enc — формат сэмплов ("format", "sampwidth") исходного и изменённого массивов
+    (по умолчанию одинаковый). changed_count — только первые changed_count сэмплов могли
+    измениться, остальные берутся только из исходного массива. nchannels — число
+    чередующихся каналов для длины сегмента (по умолчанию из params или 1).
+    progress — необязательный progress("stats", сэмплов, всего) после каждого блока.
+    hashers — необязательная пара хэшей (hashlib) исходного и изменённого массивов: в них
+    заодно добавляются сырые байты блоков (отпечатки для resultcache без отдельного чтения).
+    """
+    params_enc = params_enc or params
+    total_samples = len(samples_orig)
+    if changed_count is None:
+        changed_count = total_samples
+    metrics = QualityMetrics(SEGMENT_FRAMES * (nchannels or params.get("nchannels", 1)))
+    for start in range(0, total_samples, CHUNK_SAMPLES):
+        stop = min(start + CHUNK_SAMPLES, total_samples)
+        original = samples_to_float(samples_orig[start:stop], params)
+        if hashers is not None:
+            _update_hashers(hashers, samples_orig, samples_enc, start, stop, changed_count)
+        if start >= changed_count:
+            metrics.update_unchanged(original)
+        elif stop > changed_count:
+            split = changed_count - start
+            metrics.update(original[:split], samples_to_float(samples_enc[start:changed_count], params_enc))
+            metrics.update_unchanged(original[split:])
+        else:
+            metrics.update(original, samples_to_float(samples_enc[start:stop], params_enc))
+        if progress is not None:
+            progress("stats", stop, total_samples)
+    return metrics.result(integer=params["format"] == "int" and params_enc["format"] == "int")
+
+
+def _update_hashers(hashers, samples_orig, samples_enc, start, stop, changed_count):
+    """Байты блока start..stop в хэши; после changed_count изменённый массив совпадает с исходным."""
+    hasher_orig, hasher_enc = hashers
+    update_hasher(hasher_orig, samples_orig[start:stop])
+    split = min(max(changed_count, start), stop)
+    if split > start:
+        update_hasher(hasher_enc, samples_enc[start:split])
+    if stop > split:
+        update_hasher(hasher_enc, samples_orig[split:stop])
+
+
+def compare_wav_files(original_wav_path, encoded_wav_path, use_cache=True, progress=None, result_cache=None):
+    """Сравнение исходного и изменённого WAV-файлов: метрики compare_samples.
+
+    Результат кэшируется по паре файлов и сбрасывается при изменении любого из них.
+    result_cache — необязательный resultcache.ResultCache: результат сохраняется и ищется
+    по отпечаткам содержимого обоих файлов (они считаются заодно со сравнением).
+    """
+    key = (file_key(original_wav_path), file_key(encoded_wav_path))
+    if use_cache:
+        with _pair_cache_lock:
+            stats = _pair_cache.get(key)
+            if stats is not None:
+                _pair_cache.move_to_end(key)
+                return dict(stats)
+    if use_cache and result_cache is not None:
+        digests = (result_cache.known_digest(original_wav_path), result_cache.known_digest(encoded_wav_path))
+        if None not in digests:
+            stats = result_cache.get(ResultCache.make_key("compare", digests))
+            if stats is not None:
+                _remember_pair(key, stats)
+                return stats
+
+    params = read_wav_header(original_wav_path)
+    params_enc = read_wav_header(encoded_wav_path)
+    if (params["format"], params["sampwidth"]) != (params_enc["format"], params_enc["sampwidth"]):
+        raise ValueError("Форматы сэмплов файлов не совпадают!")
+    samples_orig = open_samples(original_wav_path, header=params)
+    samples_enc = open_samples(encoded_wav_path, header=params_enc)
+    if len(samples_orig) != len(samples_enc):
+        raise ValueError("Длины файлов не совпадают!")
+    hashers = (new_hasher(), new_hasher()) if result_cache is not None else None
+    stats = compare_samples(samples_orig, samples_enc, params, progress=progress, hashers=hashers)
+
+    if result_cache is not None:
+        remember_comparison(result_cache, original_wav_path, encoded_wav_path, hashers, stats)
+    if use_cache:
+        _remember_pair(key, stats)
+    return stats
+
+
+def _remember_pair(key, stats):
+    with _pair_cache_lock:
+        _pair_cache[key] = dict(stats)
+        while len(_pair_cache) > PAIR_CACHE_SIZE:
+            _pair_cache.popitem(last=False)
+
+
+def remember_comparison(result_cache, original_wav_path, encoded_wav_path, hashers, stats):
+    """Сохранение отпечатков обоих файлов (из хэшей compare_samples) и метрик их сравнения."""
+    digests = tuple(hasher.hexdigest() for hasher in hashers)
+    result_cache.remember_digest(original_wav_path, digests[0])
+    result_cache.remember_digest(encoded_wav_path, digests[1])
+    result_cache.put(ResultCache.make_key("compare", digests), stats)
@@ -1,48 +1,70 @@
+import os
+import sys
+
 import numpy as np
-import scipy.io.wavfile as wav
 
-def normalize_audio(data):
-    return data / np.max(np.abs(data)) if np.max(np.abs(data)) != 0 else data
+# Общие модули лежат в корне репозитория (скрипты запускаются и из папки research)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import CHUNK_SAMPLES, SEGMENT_FRAMES, QualityMetrics, compare_samples
+from wavmap import read_wav_header, open_samples, samples_to_float
+
+
+def _peak(samples, params):
+    """Максимум |сэмпла| (проход блоками по CHUNK_SAMPLES)."""
+    peak = 0.0
+    for start in range(0, len(samples), CHUNK_SAMPLES):
+        block = samples_to_float(samples[start:start + CHUNK_SAMPLES], params)
+        if len(block):
+            peak = max(peak, float(np.max(np.abs(block))))
+    return peak
+
+
+def _compare_normalized(data_orig, data_stego, params_orig, params_stego):
+    """Метрики сигналов, каждый из которых поделён на свой пиковый уровень."""
+    peak_orig = _peak(data_orig, params_orig) or 1.0
+    peak_stego = _peak(data_stego, params_stego) or 1.0
+    metrics = QualityMetrics(SEGMENT_FRAMES)
+    for start in range(0, len(data_orig), CHUNK_SAMPLES):
+        stop = start + CHUNK_SAMPLES
+        metrics.update(samples_to_float(data_orig[start:stop], params_orig) / peak_orig,
+                       samples_to_float(data_stego[start:stop], params_stego) / peak_stego)
+    return metrics.result()
+
+
+def calculate_quality(original_path, stego_path, normalize=True):
+    """Метрики первого канала стего-файла относительно первого канала исходного (metrics.py).
+
+    Файлы могут различаться числом каналов и форматом сэмплов (например, моно-результат
+    фазового кодирования стерео-файла); сравнивается общая длина.
+    normalize=True — как в исследовании (таблица в README): каждый сигнал делится на свой
+    пиковый уровень, поэтому разница громкости не считается шумом. normalize=False — метрики
+    по значениям сэмплов, как в hide_message и cli analyze.
+    """
+    params_orig = read_wav_header(original_path)
+    params_stego = read_wav_header(stego_path)
 
-def calculate_snr(original_path, stego_path):
-    # Загрузка аудиофайлов
-    rate_orig, data_orig = wav.read(original_path)
-    rate_stego, data_stego = wav.read(stego_path)
-    print(data_orig)
-    print(data_stego)
     # Проверка на совпадение частоты дискретизации
-    if rate_orig != rate_stego:
+    if params_orig["framerate"] != params_stego["framerate"]:
         raise ValueError("Частоты дискретизации не совпадают.")
 
-    # Приведение к одному количеству каналов (моно)
-    if data_orig.ndim > 1:
-        data_orig = data_orig[:, 0]
-    if data_stego.ndim > 1:
-        data_stego = data_stego[:, 0]
-
-    # Обрезка до одинаковой длины
+    # Первый канал без копирования: срез memmap с шагом в число каналов
+    data_orig = open_samples(original_path, header=params_orig)[::params_orig["nchannels"]]
+    data_stego = open_samples(stego_path, header=params_stego)[::params_stego["nchannels"]]
     min_len = min(len(data_orig), len(data_stego))
-    data_orig = data_orig[:min_len].astype(np.float64)
-    data_stego = data_stego[:min_len].astype(np.float64)
-
-    # 🔄 Нормализация обоих сигналов
-    data_orig = normalize_audio(data_orig)
-    data_stego = normalize_audio(data_stego)
+    if normalize:
+        return _compare_normalized(data_orig[:min_len], data_stego[:min_len], params_orig, params_stego)
+    return compare_samples(data_orig[:min_len], data_stego[:min_len], params_orig, params_stego, nchannels=1)
 
-    # Расчёт мощностей
-    signal_power = np.sum(data_orig ** 2)
-    noise_power = np.sum((data_orig - data_stego) ** 2)
 
-    if noise_power == 0:
-        return float('inf')
+def calculate_snr(original_path, stego_path, normalize=True):
+    return calculate_quality(original_path, stego_path, normalize)["snr"]
 
-    snr = 10 * np.log10(signal_power / noise_power)
-    return snr
 
 # Пример использования
 if __name__ == "__main__":
     original_path = "audio/Sample_general.wav"
     stego_path = "output/Phaze.wav"
 
-    snr = calculate_snr(original_path, stego_path)
-    print(f"SNR: {snr:.2f} dB")
+    stats = calculate_quality(original_path, stego_path)
+    print(f"SNR: {stats['snr']:.2f} dB")
+    print(f"Сегментный SNR: {stats['segmental_snr']:.2f} dB")
@@ -1,59 +1,145 @@
-import wave
-import numpy as np
-import matplotlib.pyplot as plt
-from scipy.fft import fft, fftfreq
 import glob
+import hashlib
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def load_audio(file_path):
-    with wave.open(file_path, 'rb') as wav_file:
-        params = wav_file.getparams()
-        frames = wav_file.readframes(params.nframes)
-        audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32)
-    return audio, params.framerate
+import numpy as np
 
-def plot_amplitude_over_time(audio, sample_rate, label, ax):
-    time = np.linspace(0, len(audio) / sample_rate, num=len(audio))
-    ax.plot(time, audio, label=label)
+# Общие модули лежат в корне репозитория (скрипты запускаются и из папки research)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stft import iter_mono, iter_spectra, CHUNK_FRAMES
+from wavmap import read_wav_header
+
+# Ширина графика в точках: огибающая сигнала строится по столбцу пикселей
+FIG_WIDTH = 10
+DPI = 100
+WIDTH_PX = FIG_WIDTH * DPI
+# Окно и шаг усреднения спектра по Уэлчу
+WELCH_WINDOW = 4096
+WELCH_HOP = 2048
+CACHE_FOLDER = ".cache"
+
+
+def waveform_envelope(wav_path, width=WIDTH_PX, header=None):
+    """Минимум и максимум моно-сигнала по width столбцам (одному столбцу — frames_per_px сэмплов)."""
+    if header is None:
+        header = read_wav_header(wav_path)
+    frames_per_px = max(1, -(-header["nframes"] // width))
+    # Блоки кратны столбцу, поэтому столбцы не разрезаются между блоками
+    chunk_frames = max(1, CHUNK_FRAMES // frames_per_px) * frames_per_px
+    lows, highs = [], []
+    for block in iter_mono(wav_path, header, chunk_frames):
+        starts = np.arange(0, len(block), frames_per_px)
+        lows.append(np.minimum.reduceat(block, starts))
+        highs.append(np.maximum.reduceat(block, starts))
+    if not lows:
+        return np.zeros(0), np.zeros(0), frames_per_px
+    return np.concatenate(lows), np.concatenate(highs), frames_per_px
+
+
+def welch_spectrum(wav_path, window=WELCH_WINDOW, hop=WELCH_HOP, header=None):
+    """Амплитудный спектр, усреднённый по кадрам с окном Ханна (метод Уэлча): частоты и амплитуды."""
+    if header is None:
+        header = read_wav_header(wav_path)
+    power = np.zeros(window // 2 + 1)
+    frames = 0
+    for spectra in iter_spectra(wav_path, window, hop, header):
+        power += np.square(spectra).sum(axis=0)
+        frames += len(spectra)
+    freqs = np.fft.rfftfreq(window, 1 / header["framerate"])
+    if frames == 0:
+        return freqs, power
+    # Нормировка на сумму окна: синусоида амплитуды A даёт пик A
+    return freqs, 2.0 / np.hanning(window).sum() * np.sqrt(power / frames)
+
+
+def _cache_path(file_path, cache_dir, width, window, hop):
+    """Файл кэша: ключ — путь, время изменения и размер файла и параметры расчёта."""
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{window}|{hop}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npz")
+
+
+def summarize_file(file_path, width=WIDTH_PX, window=WELCH_WINDOW, hop=WELCH_HOP, cache_dir=None):
+    """Огибающая и спектр файла для графиков; с cache_dir берутся из кэша .npz, пока файл не изменится."""
+    cache_path = _cache_path(file_path, cache_dir, width, window, hop) if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            return {name: cached[name] for name in cached.files}
+
+    header = read_wav_header(file_path)
+    low, high, frames_per_px = waveform_envelope(file_path, width, header)
+    freqs, spectrum = welch_spectrum(file_path, window, hop, header)
+    summary = {
+        "time": np.arange(len(low)) * frames_per_px / header["framerate"],
+        "low": low,
+        "high": high,
+        "freqs": freqs,
+        "spectrum": spectrum
+    }
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Запись через временный файл: параллельный процесс не увидит недописанный кэш
+        tmp_path = cache_path + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **summary)
+        os.replace(tmp_path, cache_path)
+    return summary
+
+
+def plot_amplitude_over_time(summary, label, ax):
+    ax.fill_between(summary["time"], summary["low"], summary["high"], label=label, linewidth=0.5)
     ax.set_xlabel("Время (с)")
     ax.set_ylabel("Амплитуда")
     ax.grid(True)
     ax.legend()
 
-def plot_frequency_spectrum(audio, sample_rate, label, ax):
-    N = len(audio)
-    T = 1.0 / sample_rate
-    freqs = fftfreq(N, T)[:N // 2]
-    y = fft(audio)
-    spectrum = 2.0 / N * np.abs(y[:N // 2])
 
-    ax.plot(freqs, spectrum, label=label)
+def plot_frequency_spectrum(summary, label, ax):
+    ax.plot(summary["freqs"], summary["spectrum"], label=label)
     ax.set_xlabel("Частота [Гц]")
     ax.set_ylabel("Амплитуда")
     ax.legend()
 
-def compare_audio_files(file_paths, output_folder="plots"):
+
+def compare_audio_files(file_paths, output_folder="plots", use_cache=True, workers=None):
+    """
+    Графики амплитудно-временной и амплитудно-частотной характеристик файлов в output_folder.
+
+    Файлы обрабатываются параллельно в процессах, каждый читается блоками: вместо всех сэмплов
+    рисуется огибающая (минимум и максимум на столбец пикселей), вместо полного БПФ — спектр Уэлча.
+    Огибающие и спектры кэшируются в output_folder/.cache, пока файлы не изменятся.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
     os.makedirs(output_folder, exist_ok=True)
+    cache_dir = os.path.join(output_folder, CACHE_FOLDER) if use_cache else None
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summaries = list(executor.map(summarize_file, file_paths, [WIDTH_PX] * len(file_paths),
+                                      [WELCH_WINDOW] * len(file_paths), [WELCH_HOP] * len(file_paths),
+                                      [cache_dir] * len(file_paths)))
 
     # График для амплитудно-временной характеристики
-    fig_time, axs_time = plt.subplots(len(file_paths), 1, figsize=(10, 2 * len(file_paths)))
+    fig_time, axs_time = plt.subplots(len(file_paths), 1, figsize=(FIG_WIDTH, 2 * len(file_paths)), dpi=DPI)
 
     # График для амплитудно-частотной характеристики
-    fig_freq, axs_freq = plt.subplots(len(file_paths), 1, figsize=(10, 2 * len(file_paths)))
+    fig_freq, axs_freq = plt.subplots(len(file_paths), 1, figsize=(FIG_WIDTH, 2 * len(file_paths)), dpi=DPI)
 
     if len(file_paths) == 1:
         axs_time = [axs_time]
         axs_freq = [axs_freq]
 
-    for i, file_path in enumerate(file_paths):
-        audio, sample_rate = load_audio(file_path)
+    for i, (file_path, summary) in enumerate(zip(file_paths, summaries)):
         label = os.path.basename(file_path).split('.')[0]  # имя без расширения
 
         # Строим амплитудно-временную характеристику
-        plot_amplitude_over_time(audio, sample_rate, label, axs_time[i])
+        plot_amplitude_over_time(summary, label, axs_time[i])
 
         # Строим амплитудно-частотную характеристику
-        plot_frequency_spectrum(audio, sample_rate, label, axs_freq[i])
+        plot_frequency_spectrum(summary, label, axs_freq[i])
 
     # Сохраняем графики
     time_plot_path = os.path.join(output_folder, "amplitude_time.png")
@@ -70,6 +156,7 @@ def compare_audio_files(file_paths, output_folder="plots"):
     print(f"Графики амплитудно-временной характеристики сохранены в {time_plot_path}")
     print(f"Графики амплитудно-частотной характеристики сохранены в {freq_plot_path}")
 
+
 if __name__ == "__main__":
     # Пример использования
     folder_path = 'output/'
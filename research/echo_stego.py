@@ -1,21 +1,104 @@
 import numpy as np
 from scipy.io import wavfile
-from scipy.signal import correlate
 import os
+import sys
+
+# Общие модули лежат в корне репозитория (скрипты запускаются и из папки research)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bitpack import to_bits, from_bits
+
+# Сколько сэмплов обрабатывается за один пакет фреймов
+BATCH_SAMPLES = 1 << 20
+# Минимальный фрейм в задержках delay_1: на записи из research/audio кепстральный декодер
+# без ошибок читает фреймы от 12 задержек, а на 201 сэмпле (фрейм чуть длиннее эха) — наугад
+MIN_FRAME_DELAYS = 12
 
 
 class EchoHidingSteganography:
-    def __init__(self, delay_0=100, delay_1=200, attenuation=0.6):
+    def __init__(self, delay_0=100, delay_1=200, attenuation=0.6, mode="frame", transition=256,
+                 decoder="correlation"):
+        """
+        mode="frame" — эхо добавляется внутри каждого фрейма отдельно;
+        mode="mixer" — эхо с задержками delay_0/delay_1 считается по всему сигналу и смешивается
+        сглаженным окном (переход длиной transition сэмплов на границах фреймов).
+        decoder="correlation" — сравнение автокорреляции фрейма на двух задержках;
+        decoder="cepstrum" — сравнение пиков кепстра фрейма на задержках delay_0/delay_1.
+        """
+        if mode not in ("frame", "mixer"):
+            raise ValueError(f"Неизвестный режим эха: {mode}")
+        if decoder not in ("correlation", "cepstrum"):
+            raise ValueError(f"Неизвестный декодер эха: {decoder}")
         self.delay_0 = delay_0
         self.delay_1 = delay_1
         self.attenuation = attenuation
-
-    def _text_to_bits(self, text):
-        return ''.join(f'{ord(c):08b}' for c in text)
-
-    def _bits_to_text(self, bits):
-        chars = [chr(int(bits[i:i + 8], 2)) for i in range(0, len(bits), 8)]
-        return ''.join(chars)
+        self.mode = mode
+        self.transition = transition
+        self.decoder = decoder
+
+    @property
+    def min_frame_size(self):
+        """Наименьший фрейм на бит, который декодер надёжно читает (MIN_FRAME_DELAYS задержек)."""
+        return max(self.delay_0, self.delay_1) * MIN_FRAME_DELAYS
+
+    def capacity(self, nframes, frame_size=None):
+        """Максимальная длина сообщения в байтах для файла из nframes кадров.
+
+        По умолчанию берётся min_frame_size; encode_samples растягивает фреймы на весь сигнал,
+        но не принимает сообщения, для которых фрейм вышел бы короче min_frame_size.
+        """
+        if frame_size is None:
+            frame_size = self.min_frame_size
+        if frame_size < self.min_frame_size:
+            return 0
+        return nframes // frame_size // 8
+
+    def _batches(self, total_bits, frame_size):
+        """Диапазоны фреймов, обрабатываемых за один раз (не больше BATCH_SAMPLES сэмплов)."""
+        rows = max(1, BATCH_SAMPLES // max(frame_size, 1))
+        for first in range(0, total_bits, rows):
+            yield first, min(first + rows, total_bits)
+
+    def _encode_frames(self, signal, bits, frame_size):
+        """Эхо внутри фреймов: матрица (биты, frame_size), обе задержки применяются пакетно."""
+        encoded = signal.copy()
+        for first, last in self._batches(len(bits), frame_size):
+            frames = signal[first * frame_size:last * frame_size].reshape(-1, frame_size)
+            result = frames.copy()
+            for delay, rows in ((self.delay_0, bits[first:last] == 0), (self.delay_1, bits[first:last] == 1)):
+                if frame_size <= delay:
+                    continue  # Фрейм слишком маленький для эха
+                result[rows, delay:] += frames[rows, :-delay] * self.attenuation
+            encoded[first * frame_size:last * frame_size] = result.ravel()
+        return encoded
+
+    def _encode_mixer(self, signal, bits, frame_size):
+        """Эхо по всему сигналу, смешанное сглаженным окном по битам."""
+        length = len(bits) * frame_size
+        mixer = np.repeat(bits.astype(np.float64), frame_size)
+        if 1 < self.transition <= length:
+            window = np.hanning(self.transition)
+            mixer = np.convolve(mixer, window / window.sum(), mode='same')
+
+        encoded = signal.copy()
+        for delay, weight in ((self.delay_0, 1 - mixer), (self.delay_1, mixer)):
+            if delay >= length:
+                continue
+            encoded[delay:length] += signal[:length - delay] * self.attenuation * weight[delay:]
+        return encoded
+
+    def encode_samples(self, signal, message):
+        """Встраивание сообщения (str в UTF-8 или bytes) в буфер сэмплов одного канала (float64);
+        возвращает новый буфер."""
+        data = message.encode('utf-8') if isinstance(message, str) else bytes(message)
+        available = self.capacity(len(signal))
+        if not data or len(data) > available:
+            raise ValueError(f"Сообщение должно занимать от 1 до {available} байт в UTF-8!")
+        bits = to_bits(data)
+        # Не меньше min_frame_size: сообщение в пределах capacity всегда читается обратно
+        frame_size = int(len(signal) / len(bits))
+        if self.mode == "mixer":
+            return self._encode_mixer(signal, bits, frame_size)
+        return self._encode_frames(signal, bits, frame_size)
 
     def encode(self, input_wav_path, output_wav_path, message):
         rate, data = wavfile.read(input_wav_path)
@@ -23,60 +106,84 @@ class EchoHidingSteganography:
         if data.ndim > 1:
             data = data[:, 0]  # Только один канал
 
-        message_bits = self._text_to_bits(message)
-        frame_size = int(len(data) / len(message_bits))
-        encoded = np.copy(data)
+        encoded = self.encode_samples(data.astype(np.float64), message)
 
-        for i, bit in enumerate(message_bits):
-            start = i * frame_size
-            end = start + frame_size
-            delay = self.delay_0 if bit == '0' else self.delay_1
-
-            if end - start <= delay:
-                continue  # Фрейм слишком маленький для эха
-
-            frame = encoded[start:end]
-            echo = np.zeros_like(frame)
-            echo[delay:] = frame[:-delay] * self.attenuation
-            encoded[start:end] = frame + echo
-
-        os.makedirs(os.path.dirname(output_wav_path), exist_ok=True)
-        wavfile.write(output_wav_path, rate, encoded.astype(np.int16))
+        if os.path.dirname(output_wav_path):
+            os.makedirs(os.path.dirname(output_wav_path), exist_ok=True)
+        wavfile.write(output_wav_path, rate, np.clip(np.round(encoded), -32768, 32767).astype(np.int16))
         print(f"[+] Echo-скрытие завершено. Файл сохранён как: {output_wav_path}")
 
-    def decode(self, encoded_wav_path, message_length):
+    @staticmethod
+    def _row_correlation(a, b):
+        """Коэффициент корреляции Пирсона для каждой строки матриц a и b."""
+        a = a - a.mean(axis=1, keepdims=True)
+        b = b - b.mean(axis=1, keepdims=True)
+        denominator = np.sqrt(np.einsum('ij,ij->i', a, a) * np.einsum('ij,ij->i', b, b))
+        numerator = np.einsum('ij,ij->i', a, b)
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    def _cepstrum_at_delays(self, frames):
+        """Значения вещественного кепстра всех фреймов на задержках delay_0 и delay_1.
+
+        Один пакетный rfft по матрице фреймов; обратное преобразование считается только
+        для двух нужных кепстральных отсчётов (скалярным произведением с косинусами).
+        """
+        frame_size = frames.shape[1]
+        spectrum = np.fft.rfft(frames * np.hanning(frame_size), axis=1)
+        log_magnitude = np.log(np.abs(spectrum) + 1e-12)
+
+        k = np.arange(log_magnitude.shape[1])
+        weights = np.full(len(k), 2.0)
+        weights[0] = 1.0
+        if frame_size % 2 == 0:
+            weights[-1] = 1.0
+        delays = np.array([self.delay_0, self.delay_1])
+        basis = weights[:, None] * np.cos(2 * np.pi * np.outer(k, delays) / frame_size) / frame_size
+        cepstrum = log_magnitude @ basis
+        return cepstrum[:, 0], cepstrum[:, 1]
+
+    def decode_bits(self, data, total_bits):
+        """Биты и уверенность по каждому фрейму (0 — неразличимо, больше — надёжнее)."""
+        frame_size = int(len(data) / total_bits)
+        bits = np.zeros(total_bits, dtype=np.uint8)
+        confidence = np.zeros(total_bits)
+
+        # Фреймы короче задержки дают бит '0' с нулевой уверенностью
+        if frame_size <= max(self.delay_0, self.delay_1):
+            return bits, confidence
+
+        for first, last in self._batches(total_bits, frame_size):
+            frames = data[first * frame_size:last * frame_size].reshape(-1, frame_size).astype(np.float64)
+            if self.decoder == "cepstrum":
+                score_0, score_1 = self._cepstrum_at_delays(frames)
+            else:
+                score_0 = self._row_correlation(frames[:, :-self.delay_0], frames[:, self.delay_0:])
+                score_1 = self._row_correlation(frames[:, :-self.delay_1], frames[:, self.delay_1:])
+            bits[first:last] = score_0 <= score_1
+            confidence[first:last] = np.abs(score_1 - score_0)
+        return bits, confidence
+
+    def decode_with_confidence(self, encoded_wav_path, message_length):
+        """Декодирование с уверенностью по каждому фрейму (биту)."""
         rate, data = wavfile.read(encoded_wav_path)
 
         if data.ndim > 1:
             data = data[:, 0]
 
-        total_bits = message_length * 8
-        frame_size = int(len(data) / total_bits)
-        decoded_bits = ''
-
-        for i in range(total_bits):
-            start = i * frame_size
-            end = start + frame_size
-            frame = data[start:end]
-
-            if end - start <= max(self.delay_0, self.delay_1):
-                decoded_bits += '0'
-                continue
-
-            # Создаем опозданные версии сигнала
-            frame_0 = frame[:-self.delay_0]
-            delayed_0 = frame[self.delay_0:]
+        return self.decode_samples(data, message_length)
 
-            frame_1 = frame[:-self.delay_1]
-            delayed_1 = frame[self.delay_1:]
+    def decode_data(self, data, message_length):
+        """Байты сообщения длиной message_length и уверенность по битам из буфера сэмплов."""
+        bits, confidence = self.decode_bits(data, message_length * 8)
+        return from_bits(bits), confidence
 
-            # Корреляция между оригиналом и задержанным сигналом
-            corr_0 = np.corrcoef(frame_0, delayed_0)[0, 1]
-            corr_1 = np.corrcoef(frame_1, delayed_1)[0, 1]
+    def decode_samples(self, data, message_length):
+        """Текст сообщения из message_length байтов UTF-8 (ошибочные байты заменяются) и уверенность."""
+        message, confidence = self.decode_data(data, message_length)
+        return message.decode('utf-8', errors='replace'), confidence
 
-            decoded_bits += '0' if corr_0 > corr_1 else '1'
-
-        return self._bits_to_text(decoded_bits)
+    def decode(self, encoded_wav_path, message_length):
+        return self.decode_with_confidence(encoded_wav_path, message_length)[0]
 
 
 if __name__ == "__main__":
@@ -87,5 +194,5 @@ if __name__ == "__main__":
     stego = EchoHidingSteganography()
     stego.encode(input_wav, output_wav, message)
 
-    decoded = stego.decode(output_wav, message_length=len(message))
+    decoded = stego.decode(output_wav, message_length=len(message.encode('utf-8')))
     print("Decoded message:", decoded)
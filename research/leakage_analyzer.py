@@ -1,63 +1,145 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import wave
 import os
-import scipy.fftpack as fft
+import sys
+
+import numpy as np
+
+# Общие модули лежат в корне репозитория (скрипты запускаются и из папки research)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stft import iter_spectra, DEFAULT_WINDOW, DEFAULT_HOP
+from wavmap import read_wav_header, open_samples, samples_to_float
+
+# Границы частотных полос (Гц); последняя полоса идёт до частоты Найквиста
+BAND_EDGES = (0, 250, 500, 1000, 2000, 4000, 8000, 16000)
+# Шаг оценок утечки по времени (с)
+TIME_STEP = 1.0
+
+# Суммы для корреляции Пирсона: n, Σo, Σm, Σo², Σm², Σo·m
+_SUMS = 6
+
+
+def _products(original, modified):
+    """Слагаемые корреляции для пары пакетов спектров: массив (_SUMS, кадры, отсчёты)."""
+    return np.stack([np.ones_like(original), original, modified,
+                     original * original, modified * modified, original * modified])
+
+
+def _leakage(sums):
+    """1 - корреляция Пирсона по накопленным суммам (по последней оси); 0 для пустых ячеек."""
+    n, so, sm, soo, smm, som = sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = som - so * sm / n
+        variance = (soo - so * so / n) * (smm - sm * sm / n)
+        correlation = np.where(variance > 0, covariance / np.sqrt(variance), 1.0)
+    return np.where(n > 0, 1 - correlation, 0.0)
+
+
+def legacy_leakage_score(original_file, modified_file):
+    """Прежняя оценка утечки: 1 - корреляция амплитуд одного БПФ по всем сэмплам файлов.
+
+    Каналы не разделяются (сэмплы берутся подряд), а спектры файлов разной длины обрезаются
+    до общей длины, поэтому стерео-оригинал с моно-результатом сравнивается по несовпадающим
+    отсчётам. Так посчитан столбец «Leakage (БПФ)» в README. Память — O(длина файла).
+    """
+    spectra = []
+    for path in (original_file, modified_file):
+        params = read_wav_header(path)
+        spectra.append(np.abs(np.fft.fft(samples_to_float(open_samples(path, header=params), params))))
+    count = min(len(spectrum) for spectrum in spectra)
+    return float(1 - np.corrcoef(spectra[0][:count], spectra[1][:count])[0, 1])
+
 
-def analyze_leakage(original_file, modified_file):
+def analyze_leakage(original_file, modified_file, window=DEFAULT_WINDOW, hop=DEFAULT_HOP,
+                    band_edges=BAND_EDGES, time_step=TIME_STEP, plot_path=None, legacy=False):
     """
-    Оценка утечки информации путем сравнения частотных спектров оригинального и модифицированного аудиофайла.
-    
+    Оценка утечки информации по кратковременным спектрам (STFT) оригинального и модифицированного файла.
+
+    Спектры считаются потоково (окно Ханна window сэмплов, шаг hop), в памяти хранятся только
+    суммы для корреляции амплитуд: по частотным полосам и по интервалам времени time_step.
+    Утечка = 1 - корреляция амплитудных спектров: 0 — спектры совпадают. Корреляция считается
+    по всем отсчётам всех кадров, поэтому оценка меньше прежней по одному БПФ всего файла
+    (legacy_leakage_score) и с ней не сравнима.
+
     :param original_file: Путь к оригинальному аудиофайлу
     :param modified_file: Путь к модифицированному аудиофайлу (с скрытыми данными)
-    :return: Степень утечки информации
+    :param plot_path: Если задан, графики утечки по полосам и по времени сохраняются в этот файл
+    :param legacy: Добавить в результат прежнюю оценку legacy_leakage_score (читает файлы целиком)
+    :return: Словарь: общая утечка, утечка по полосам и по времени
     """
-    # Чтение аудиофайлов
-    def read_audio(file_path):
-        with wave.open(file_path, 'rb') as audio:
-            params = audio.getparams()
-            frames = audio.readframes(params.nframes)
-            audio_data = np.frombuffer(frames, dtype=np.int16)
-        return audio_data, params
-
-    original_data, _ = read_audio(original_file)
-    modified_data, _ = read_audio(modified_file)
-    
-    # Преобразование в частотную область с помощью FFT
-    def fft_analysis(data):
-        # Выполняем FFT
-        spectrum = fft.fft(data)
-        return np.abs(spectrum)  # Модуль спектра
-    
-    original_spectrum = fft_analysis(original_data)
-    modified_spectrum = fft_analysis(modified_data)
-    
-    # Приводим спектры к одинаковой длине
-    min_length = min(len(original_spectrum), len(modified_spectrum))
-    original_spectrum = original_spectrum[:min_length]
-    modified_spectrum = modified_spectrum[:min_length]
-    
-    # Сравнение спектров: использование корреляции для выявления различий
-    correlation = np.corrcoef(original_spectrum, modified_spectrum)[0, 1]
-    
-    # Визуализация спектров
-    plt.figure(figsize=(12, 6))
-    plt.subplot(2, 1, 1)
-    plt.plot(original_spectrum)
-    plt.title("Оригинальный спектр")
-    plt.subplot(2, 1, 2)
-    plt.plot(modified_spectrum)
-    plt.title("Спектр с скрытыми данными")
-    plt.show()
-    
-    # Степень утечки может быть оценена через корреляцию: чем она ниже, тем выше утечка
-    leakage_score = 1 - correlation  # Чем больше корреляция, тем меньше утечка
-    
-    return leakage_score
+    params_orig = read_wav_header(original_file)
+    params_mod = read_wav_header(modified_file)
+    framerate = params_orig["framerate"]
+    if framerate != params_mod["framerate"]:
+        raise ValueError("Частоты дискретизации не совпадают.")
+
+    freqs = np.fft.rfftfreq(window, 1 / framerate)
+    edges = [edge for edge in band_edges if edge < framerate / 2]
+    band_of_bin = np.searchsorted(edges, freqs, side='right') - 1
+    band_sums = np.zeros((_SUMS, len(edges)))
+    time_sums = np.zeros((_SUMS, 0))
+    frame_index = 0
+
+    spectra = zip(iter_spectra(original_file, window, hop, params_orig),
+                  iter_spectra(modified_file, window, hop, params_mod))
+    for original, modified in spectra:
+        count = min(len(original), len(modified))
+        products = _products(original[:count], modified[:count])
+
+        # По полосам: суммы по кадрам, затем по отсчётам полосы
+        per_bin = products.sum(axis=1)
+        band_sums += np.stack([np.bincount(band_of_bin, weights=row, minlength=len(edges)) for row in per_bin])
+
+        # По времени: суммы по отсчётам кадра, затем по кадрам интервала
+        per_frame = products.sum(axis=2)
+        buckets = ((frame_index + np.arange(count)) * hop / framerate / time_step).astype(np.int64)
+        if buckets[-1] >= time_sums.shape[1]:
+            time_sums = np.pad(time_sums, ((0, 0), (0, buckets[-1] + 1 - time_sums.shape[1])))
+        time_sums += np.stack([np.bincount(buckets, weights=row, minlength=time_sums.shape[1]) for row in per_frame])
+        frame_index += count
+
+    if frame_index == 0:
+        raise ValueError("Файлы короче одного окна STFT.")
+    result = {
+        "leakage_score": float(_leakage(band_sums.sum(axis=1))),
+        "bands": [{"low_hz": low, "high_hz": high, "leakage": float(score)}
+                  for low, high, score in zip(edges, [*edges[1:], framerate / 2], _leakage(band_sums))],
+        "time_step": time_step,
+        "time_leakage": _leakage(time_sums).tolist()
+    }
+    if legacy:
+        result["legacy_leakage_score"] = legacy_leakage_score(original_file, modified_file)
+    if plot_path is not None:
+        save_plot(result, plot_path)
+    return result
+
+
+def save_plot(result, plot_path):
+    """Графики утечки по полосам и по времени в файл (без окна: бэкенд Agg)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (ax_bands, ax_time) = plt.subplots(2, 1, figsize=(12, 6))
+    labels = [f"{band['low_hz']:g}-{band['high_hz']:g}" for band in result["bands"]]
+    ax_bands.bar(labels, [band["leakage"] for band in result["bands"]])
+    ax_bands.set_title("Утечка по частотным полосам (Гц)")
+    times = np.arange(len(result["time_leakage"])) * result["time_step"]
+    ax_time.plot(times, result["time_leakage"])
+    ax_time.set_title("Утечка по времени")
+    ax_time.set_xlabel("Время (с)")
+    fig.tight_layout()
+    if os.path.dirname(plot_path):
+        os.makedirs(os.path.dirname(plot_path), exist_ok=True)
+    fig.savefig(plot_path)
+    plt.close(fig)
+
 
 # Пример использования
-original_file = 'audio/Sample_general.wav'  # Путь к оригинальному файлу
-modified_file = 'output/Phaze.wav'  # Путь к файлу с внедренными данными
+if __name__ == "__main__":
+    original_file = 'audio/Sample_general.wav'  # Путь к оригинальному файлу
+    modified_file = 'output/Phaze.wav'  # Путь к файлу с внедренными данными
 
-leakage_score = analyze_leakage(original_file, modified_file)
-print(f'Степень утечки информации (Leakage): {leakage_score:.4f}')
+    result = analyze_leakage(original_file, modified_file, plot_path='plots/leakage.png', legacy=True)
+    print(f'Степень утечки информации (Leakage, STFT): {result["leakage_score"]:.6f}')
+    print(f'Прежняя оценка (Leakage, БПФ всего файла): {result["legacy_leakage_score"]:.4f}')
+    for band in result["bands"]:
+        print(f'  {band["low_hz"]:g}-{band["high_hz"]:g} Гц: {band["leakage"]:.4f}')
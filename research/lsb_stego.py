@@ -1,20 +1,17 @@
+import os
+import sys
 import wave
 import numpy as np
-import os
-import random
-import string
 
-LOG_FILE = 'steg_log.txt'  # Имя лог-файла для записей
+# Общие модули лежат в корне репозитория (скрипты запускаются и из папки research)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bitpack import to_bits, from_bits
 
-# Функция для записи логов о модификации сэмплов
-def log_sample_info(index, original_sample, cleared_lsb, new_bit, modified_sample):
-    with open(LOG_FILE, 'a') as log:
-        log.write(f"Index {index} - Original: {original_sample}, Cleared LSB: {cleared_lsb}, "
-                  f"New bit: {new_bit}, Modified: {modified_sample}\n")
 
 class LSBSteganography:
-    def __init__(self, log_file=LOG_FILE):
-        self.log_file = log_file
+    def __init__(self, trace=None):
+        # Необязательная трассировка с интерфейсом tracing.Trace (по умолчанию ничего не пишется)
+        self.trace = trace
 
     def hide_message(self, input_wav_path, output_wav_path, message):
         """
@@ -34,38 +31,32 @@ class LSBSteganography:
         if np.max(samples) > 32767 or np.min(samples) < -32768:
             raise ValueError(f"Сэмплы в {input_wav_path} вне диапазона int16!")
 
-        # Подготовка сообщения
-        message += '\0'  # Добавляем завершающий символ
-        bits = ''.join(format(ord(char), '08b') for char in message)
+        # Подготовка сообщения: текст в UTF-8 (bytes — как есть), 8 сэмплов на байт
+        data = message.encode('utf-8') if isinstance(message, str) else bytes(message)
+        if b'\0' in data:
+            raise ValueError("Сообщение не должно содержать байт '\\0' (это признак конца)!")
+        bits = to_bits(data + b'\0')  # Добавляем завершающий байт
         if len(bits) > len(samples):
-            raise ValueError(f"Сообщение слишком длинное для файла {input_wav_path}!")
-
-        # Очистка лог-файла перед записью
-        if os.path.exists(self.log_file):
-            os.remove(self.log_file)
-
-        # Модификация сэмплов
-        modified_samples = samples.copy().astype(np.int16)
-        for i, bit in enumerate(bits):
-            original_sample = modified_samples[i]
-            cleared_lsb = original_sample & np.int16(-2)  # -2 = 0xFFFE в int16
-            new_bit = np.int16(int(bit))  # 0 или 1
-            modified_sample = cleared_lsb | new_bit
+            raise ValueError(f"Сообщение слишком длинное для файла {input_wav_path}! "
+                             f"Максимум {self.capacity(len(samples))} байт.")
 
-            # Запись в лог-файл для первых 100 сэмплов
-            if i < 100:
-                log_sample_info(i, original_sample, cleared_lsb, new_bit, modified_sample)
-
-            if modified_sample > 32767 or modified_sample < -32768:
-                raise ValueError(f"Переполнение int16 на сэмпле {i}: {modified_sample}")
-            modified_samples[i] = modified_sample
+        # Модификация сэмплов: очистка младшего бита и запись бита сообщения
+        modified_samples = samples.copy()
+        modified_samples[:len(bits)] = (samples[:len(bits)] & np.int16(-2)) | bits
 
+        # Трассировка первых сэмплов
+        if self.trace is not None:
+            count = min(100, len(bits))
+            self.trace.record_samples(0, samples[:count], np.full(count, np.int16(-2)), modified_samples[:count])
 
         # Запись результата
         with wave.open(output_wav_path, 'wb') as wav_out:
             wav_out.setparams(params)
             wav_out.writeframes(modified_samples.tobytes())
 
+        if self.trace is not None:
+            self.trace.finish()
+
     def extract_message(self, input_wav_path):
         """
         Извлекает сообщение из аудиофайла, скрытого с использованием метода LSB.
@@ -74,46 +65,27 @@ class LSBSteganography:
             frames = wav.readframes(wav.getnframes())
             samples = np.frombuffer(frames, dtype=np.int16)
 
-        bits = ''
-        for i in range(len(samples)):
-            bits += str(samples[i] & 1)
-
-        message = ''
-        for i in range(0, len(bits), 8):
-            byte = bits[i:i + 8]
-            if len(byte) == 8:
-                char = chr(int(byte, 2))
-                if char == '\0':
-                    break
-                message += char
-        return message
+        # Младшие биты всех сэмплов, по 8 на байт, до завершающего '\0'; текст в UTF-8
+        data = from_bits((samples & 1).astype(np.uint8))
+        end = data.find(b'\0')
+        return (data if end == -1 else data[:end]).decode('utf-8', errors='replace')
     
-    def iterative_encoding(self, audio_path, output_path, max_message_length=1024):
+    def capacity(self, total_samples):
+        """Максимальная длина сообщения в байтах (текст — в UTF-8): 8 сэмплов на байт плюс завершающий '\\0'."""
+        return max(0, total_samples // 8 - 1)
+
+    def iterative_encoding(self, audio_path, output_path=None, max_message_length=None):
         """
-        Итеративный метод для проверки, сколько информации можно закодировать в аудиофайл.
-        Выводит только результат — максимальную длину сообщения, которое можно закодировать.
+        Определение максимальной длины сообщения, которое можно закодировать в аудиофайл.
+        Считается аналитически по заголовку WAV, без перебора длин и чтения сэмплов.
         """
-        for message_length in range(200000, max_message_length + 1):
-            message = ''.join(random.choices(string.ascii_letters + string.digits + string.punctuation + ' ', k=message_length))
-
-            try:
-                print(message_length)
-                self.hide_message(audio_path, output_path, message)
-                decoded_message = self.extract_message(output_path)
-                if decoded_message == message:
-                    # Если сообщение успешно закодировано и извлечено, продолжаем
-                    pass
-                else:
-                    break
-            except ValueError:
-                break
-        else:
-            # Если цикл завершился без ошибок, значит максимальная длина сообщения = max_message_length
-            print(f"Максимальная длина сообщения: {max_message_length} символов")
-            return max_message_length
-
-        print(f"Максимальная длина сообщения: {message_length - 1} символов")
-        return message_length - 1
+        with wave.open(audio_path, 'rb') as wav:
+            total_samples = wav.getnframes() * wav.getnchannels()
+        message_length = self.capacity(total_samples)
+        if max_message_length is not None:
+            message_length = min(message_length, max_message_length)
+        print(f"Максимальная длина сообщения: {message_length} байт")
+        return message_length
 
 # Пример использования
 if __name__ == "__main__":
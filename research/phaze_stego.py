@@ -1,68 +1,115 @@
+import os
+import sys
 import numpy as np
 import wave
-from scipy.fftpack import fft, ifft
+
+# Общие модули лежат в корне репозитория (скрипты запускаются и из папки research)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bitpack import to_bits, from_bits
+
+MARKER = "###"
+# Сколько сэмплов обрабатывается за один пакет сегментов
+BATCH_SAMPLES = 1 << 20
+# Минимальная амплитуда отсчёта-носителя (в единицах sqrt(N)): фаза слабых отсчётов
+# иначе теряется при округлении до int16
+MIN_MAGNITUDE = 2.0
+
 
 class PhaseSteganography:
     def __init__(self, segment_size=4096):
         self.N = segment_size  # длина сегмента для встраивания/извлечения
 
+    @property
+    def bits_per_segment(self):
+        # Все частотные отсчёты rfft, кроме постоянной составляющей и частоты Найквиста
+        return self.N // 2 - 1
+
     def _stereo_to_mono(self, audio_data, n_channels):
         if n_channels == 1:
             return audio_data
         return audio_data.reshape(-1, n_channels).mean(axis=1)
 
-    def _normalize(self, audio):
-        return audio / np.max(np.abs(audio))
-
-    def _denormalize(self, audio, dtype=np.int16):
-        max_val = np.iinfo(dtype).max
-        return (audio * max_val).astype(dtype)
-
-    def _text_to_bits(self, text):
-        return ''.join(f'{ord(c):08b}' for c in text)
-
-    def _bits_to_text(self, bits):
-        chars = []
-        for i in range(0, len(bits), 8):
-            byte = bits[i:i+8]
-            if len(byte) < 8:
-                break
-            chars.append(chr(int(byte, 2)))
-        return ''.join(chars)
-
-    def encode_message(self, audio_path, output_path, message):
+    def _read_mono(self, audio_path):
         with wave.open(audio_path, 'rb') as wav:
-            params = wav.getparams()
-            n_channels, sampwidth, framerate, nframes, comptype, compname = params
+            n_channels, sampwidth, framerate, nframes, comptype, compname = wav.getparams()
             frames = wav.readframes(nframes)
-
         audio = np.frombuffer(frames, dtype=np.int16)
-        audio = self._stereo_to_mono(audio, n_channels)
-        audio = self._normalize(audio)
+        return self._stereo_to_mono(audio, n_channels).astype(np.float64), framerate
 
-        message += "###"
-        bits = self._text_to_bits(message)
+    def _batches(self, n_segments):
+        """Диапазоны сегментов, обрабатываемых за один пакетный rfft/irfft."""
+        rows = max(1, BATCH_SAMPLES // self.N)
+        for first in range(0, n_segments, rows):
+            yield first, min(first + rows, n_segments)
 
-        if len(audio) < self.N:
-            raise ValueError("Файл слишком короткий")
+    def capacity(self, nframes):
+        """Максимальная длина сообщения в байтах (текст — в UTF-8).
 
-        if len(bits) > self.N // 2:
-            raise ValueError("Сообщение слишком длинное для выбранного сегмента.")
+        Первый сегмент служит опорой по фазе, каждый следующий несёт bits_per_segment битов;
+        маркер '###' занимает 3 байта.
+        """
+        n_segments = nframes // self.N
+        if n_segments < 2:
+            return 0
+        return max(0, (n_segments - 1) * self.bits_per_segment // 8 - len(MARKER))
 
-        segment = audio[:self.N]
-        spectrum = fft(segment)
-        magnitude = np.abs(spectrum)
-        phase = np.angle(spectrum)
+    def iterative_encoding(self, audio_path, output_path=None, max_message_length=None):
+        """
+        Определение максимальной длины сообщения, которое можно закодировать в аудиофайл.
+        Считается аналитически по заголовку WAV, без перебора длин и чтения сэмплов.
+        """
+        with wave.open(audio_path, 'rb') as wav:
+            nframes = wav.getnframes()
+        message_length = self.capacity(nframes)
+        if max_message_length is not None:
+            message_length = min(message_length, max_message_length)
+        print(f"Максимальная длина сообщения: {message_length} байт")
+        return message_length
+
+    def encode_samples(self, audio, message):
+        """Встраивание сообщения в разности фаз соседних сегментов моно-сигнала (float64).
+
+        Бит 1 поворачивает фазу отсчёта на π относительно предыдущего сегмента, бит 0 оставляет её.
+        Фаза каждого сегмента = фаза первого сегмента + π * (накопленная чётность битов),
+        поэтому весь расчёт — cumsum по оси сегментов и пакетные rfft/irfft над матрицей сегментов.
+        """
+        n_segments = len(audio) // self.N
 
-        for i, bit in enumerate(bits):
-            phase[i + 1] = 0 if bit == '0' else np.pi
-            phase[-(i + 1)] = -phase[i + 1]
+        if n_segments < 2:
+            raise ValueError("Файл слишком короткий")
 
-        modified = np.real(ifft(magnitude * np.exp(1j * phase)))
-        new_audio = np.copy(audio)
-        new_audio[:self.N] = modified
+        data = message.encode('utf-8') if isinstance(message, str) else bytes(message)
+        bits = to_bits(data + MARKER.encode('latin-1'))
+        if len(bits) > (n_segments - 1) * self.bits_per_segment:
+            raise ValueError(f"Сообщение слишком длинное для файла! Максимум {self.capacity(len(audio))} байт.")
+
+        # Биты сегментов 1..: матрица (сегменты, отсчёты), недостающие биты — нули (фаза не меняется)
+        used_segments = -(-len(bits) // self.bits_per_segment)
+        segment_bits = np.zeros(used_segments * self.bits_per_segment, dtype=np.uint8)
+        segment_bits[:len(bits)] = bits
+        segment_bits = segment_bits.reshape(used_segments, self.bits_per_segment)
+        parity = np.cumsum(segment_bits, axis=0, dtype=np.uint32) & 1
+
+        reference_phase = np.angle(np.fft.rfft(audio[:self.N]))[1:self.N // 2]
+        new_audio = np.array(audio, dtype=np.float64)
+        for first, last in self._batches(used_segments):
+            start, end = (first + 1) * self.N, (last + 1) * self.N
+            spectrum = np.fft.rfft(audio[start:end].reshape(-1, self.N), axis=1)
+            phase = reference_phase + np.pi * parity[first:last]
+            magnitude = np.maximum(np.abs(spectrum[:, 1:self.N // 2]), MIN_MAGNITUDE * np.sqrt(self.N))
+            spectrum[:, 1:self.N // 2] = magnitude * np.exp(1j * phase)
+            new_audio[start:end] = np.fft.irfft(spectrum, n=self.N, axis=1).ravel()
+
+        # Поворот фаз может поднять пики выше диапазона int16: обрезка исказила бы фазы,
+        # поэтому сигнал масштабируется целиком (масштаб фазы не меняет)
+        peak = np.abs(new_audio).max()
+        if peak > 32767:
+            new_audio *= 32767 / peak
+        return new_audio
 
-        output_int16 = self._denormalize(new_audio)
+    def encode_message(self, audio_path, output_path, message):
+        audio, framerate = self._read_mono(audio_path)
+        output_int16 = np.round(self.encode_samples(audio, message)).astype(np.int16)
 
         with wave.open(output_path, 'wb') as out_wav:
             out_wav.setparams((1, 2, framerate, len(output_int16), 'NONE', 'not compressed'))
@@ -70,48 +117,51 @@ class PhaseSteganography:
 
         print("[✓] Сообщение закодировано!")
 
-    def decode_message(self, audio_path):
-        with wave.open(audio_path, 'rb') as wav:
-            n_channels, sampwidth, framerate, nframes, comptype, compname = wav.getparams()
-            frames = wav.readframes(nframes)
+    def decode_data(self, audio, length=None):
+        """Извлечение байтов сообщения из моно-сигнала; None, если маркер конца не найден.
 
-        audio = np.frombuffer(frames, dtype=np.int16)
-        audio = self._stereo_to_mono(audio, n_channels)
-        audio = self._normalize(audio)
+        length — читать ровно столько байтов, не ища маркер (None, если сигнал короче).
+        """
+        n_segments = len(audio) // self.N
 
-        if len(audio) < self.N:
+        if n_segments < 2:
             raise ValueError("Файл слишком короткий для извлечения")
 
-        segment = audio[:self.N]
-        spectrum = fft(segment)
-        phase = np.angle(spectrum)
-
-        bits = ''
-        for i in range(1, self.N // 2):
-            bits += '0' if abs(phase[i]) < np.pi / 2 else '1'
+        marker = MARKER.encode('latin-1')
+        data = bytearray()
+        bits = np.zeros(0, dtype=np.uint8)
+        previous = np.fft.rfft(audio[:self.N])[1:self.N // 2]
+        for first, last in self._batches(n_segments - 1):
+            start, end = (first + 1) * self.N, (last + 1) * self.N
+            spectrum = np.fft.rfft(audio[start:end].reshape(-1, self.N), axis=1)[:, 1:self.N // 2]
+            # Разность фаз с предыдущим сегментом: |Δφ| > π/2 — бит 1
+            shifted = np.vstack([previous[None, :], spectrum[:-1]])
+            difference = np.angle(spectrum * np.conj(shifted))
+            bits = np.concatenate([bits, (np.abs(difference) > np.pi / 2).astype(np.uint8).ravel()])
+            previous = spectrum[-1]
+
+            whole = len(bits) // 8 * 8
+            searched = max(0, len(data) - len(marker) + 1)
+            data += from_bits(bits[:whole])
+            bits = bits[whole:]
+            if length is not None:
+                if len(data) >= length:
+                    return bytes(data[:length])
+                continue
+            # Маркер ищется только в новой части (и на стыке с предыдущей)
+            end_idx = data.find(marker, searched)
+            if end_idx != -1:
+                return bytes(data[:end_idx])
+        return None
+
+    def decode_samples(self, audio, length=None):
+        """Текст сообщения (UTF-8, ошибочные байты заменяются); None, если маркер не найден."""
+        data = self.decode_data(audio, length)
+        return None if data is None else data.decode('utf-8', errors='replace')
 
-        text = self._bits_to_text(bits)
-        end_idx = text.find("###")
-        return text[:end_idx] if end_idx != -1 else None
-
-    def iterative_encoding(self, audio_path, output_path, max_message_length=1024):
-        """
-        Итеративный метод для проверки, сколько информации можно закодировать в аудиофайл.
-        Выводит только результат — максимальную длину сообщения, которое можно закодировать.
-        """
-        for message_length in range(1, max_message_length + 1):
-            message = "A" * message_length  # Пример простого сообщения из 'A'
-
-            try:
-                self.encode_message(audio_path, output_path, message)
-                decoded_message = self.decode_message(output_path)
-                if decoded_message == message:
-                    # Если сообщение успешно закодировано и извлечено, выводим длину
-                    print(f"Максимальная длина сообщения: {message_length} символов")
-                else:
-                    break
-            except ValueError:
-                break
+    def decode_message(self, audio_path):
+        audio, _ = self._read_mono(audio_path)
+        return self.decode_samples(audio)
 
 
 # === Пример использования ===
@@ -121,5 +171,5 @@ if __name__ == "__main__":
     input_path = "audio/Sample_general.wav"
     output_path = "output/phaze_output.wav"
 
-    # Запускаем итеративное скрытие сообщений
+    # Определяем максимальную длину сообщения
     steg.iterative_encoding(input_path, output_path)
@@ -0,0 +1,158 @@
+"""Постоянный кэш результатов извлечения и сравнения, адресуемый содержимым WAV-файлов.
+
+Ключ результата — операция, отпечатки блоков data участвующих файлов (blake2b) и параметры
+операции, поэтому изменённый файл просто получает другой ключ, а копия файла под другим
+именем находит тот же результат. Отпечаток файла запоминается по пути, mtime и размеру;
+если он неизвестен, блок data читается потоково (метрики считают его заодно со сравнением,
+metrics.compare_samples(hashers=...)). Общий размер результатов ограничен max_bytes,
+при переполнении удаляются давно не использованные записи (LRU).
+
+Результаты зашифрованных паролем сообщений не кэшируются: расшифрованный текст
+не должен оставаться на диске.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from wavmap import read_wav_header, open_samples
+
+CACHE_FILE = "template/result_cache.sqlite"
+MAX_CACHE_BYTES = 32 << 20
+DIGEST_SIZE = 16
+CHUNK_SAMPLES = 1 << 20
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+def update_hasher(hasher, block):
+    """Добавление сырых байтов блока сэмплов (срез np.memmap) в отпечаток."""
+    hasher.update(np.ascontiguousarray(block))
+
+
+def data_digest(wav_path, header=None):
+    """Отпечаток блока data файла (читается блоками по CHUNK_SAMPLES сэмплов)."""
+    samples = open_samples(wav_path, header=header)
+    hasher = new_hasher()
+    for start in range(0, len(samples), CHUNK_SAMPLES):
+        update_hasher(hasher, samples[start:start + CHUNK_SAMPLES])
+    return hasher.hexdigest()
+
+
+def file_key(wav_path):
+    """Ключ файла без чтения данных: абсолютный путь, mtime (нс) и размер."""
+    stat = os.stat(wav_path)
+    return os.path.abspath(wav_path), stat.st_mtime_ns, stat.st_size
+
+
+class ResultCache:
+    """SQLite-хранилище: отпечатки файлов (путь, mtime, размер) и результаты по ключу содержимого.
+
+    Методы можно вызывать из нескольких потоков (задачи GUI): соединение общее, под блокировкой.
+    """
+
+    def __init__(self, cache_path=CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, digest TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, kind TEXT, value BLOB, size INTEGER, used REAL)"
+            )
+
+    def known_digest(self, wav_path):
+        """Запомненный отпечаток файла или None, если файл изменился или ещё не встречался."""
+        path, mtime_ns, size = file_key(wav_path)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT digest FROM digests WHERE path = ? AND mtime_ns = ? AND size = ?",
+                (path, mtime_ns, size)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def remember_digest(self, wav_path, digest):
+        path, mtime_ns, size = file_key(wav_path)
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO digests (path, mtime_ns, size, digest) VALUES (?, ?, ?, ?)",
+                (path, mtime_ns, size, digest)
+            )
+
+    def file_digest(self, wav_path):
+        """Отпечаток файла: запомненный или вычисленный заново потоковым чтением блока data."""
+        digest = self.known_digest(wav_path)
+        if digest is None:
+            digest = data_digest(wav_path, read_wav_header(wav_path))
+            self.remember_digest(wav_path, digest)
+        return digest
+
+    @staticmethod
+    def make_key(operation, digests, **params):
+        """Ключ результата: операция, отпечатки файлов и параметры (ключи и пароли — только хэшем)."""
+        params = {name: hashlib.sha256(value.encode('utf-8') if isinstance(value, str) else value).hexdigest()
+                  if name in ("key", "password") and value is not None else value
+                  for name, value in params.items()}
+        return json.dumps([operation, list(digests), params], sort_keys=True, default=str)
+
+    def get(self, key):
+        """Результат по ключу или None; обращение обновляет время использования для LRU."""
+        with self._lock, self.connection:
+            row = self.connection.execute("SELECT kind, value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+        kind, value = row
+        if kind == "bytes":
+            return bytes(value)
+        return json.loads(value)
+
+    def put(self, key, value):
+        """Сохранение результата (bytes или значение JSON: str, dict метрик) с вытеснением старых."""
+        if isinstance(value, (bytes, bytearray)):
+            kind, stored = "bytes", bytes(value)
+        else:
+            kind, stored = "json", json.dumps(value).encode('utf-8')
+        size = len(key) + len(stored)
+        if size > self.max_bytes:
+            return
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results (key, kind, value, size, used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, stored, size, time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        """Удаление давно не использованных результатов, пока общий размер больше max_bytes."""
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self.connection.execute("SELECT key, size FROM results ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,59 @@
+"""Ключевое рассеивание позиций сообщения по всему файлу.
+
+Перестановка индексов 0..size-1 задаётся шифром Фейстеля на домене 2^(2h) >= size
+с «прогулкой по циклу» (cycle walking) для значений за пределами size. Таблица перестановки
+не хранится: позиции вычисляются векторно для любого блока индексов, память не зависит от размера файла.
+"""
+import hashlib
+
+import numpy as np
+
+ROUNDS = 6
+
+
+def _mix(x):
+    """Перемешивание 64-битных значений (финализатор splitmix64)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def derive_key(key):
+    """Ключ в байтах (строки кодируются в UTF-8)."""
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    if not key:
+        raise ValueError("Ключ не должен быть пустым!")
+    return bytes(key)
+
+
+class FeistelPermutation:
+    """Ключевая перестановка индексов 0..size-1 без таблицы в памяти."""
+
+    def __init__(self, size, key):
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.mask = np.uint64((1 << self.half_bits) - 1)
+        digest = hashlib.blake2b(derive_key(key), digest_size=8 * ROUNDS, person=b"lsb-scatter").digest()
+        self.round_keys = np.frombuffer(digest, dtype='<u8')
+
+    def _encrypt(self, x):
+        shift = np.uint64(self.half_bits)
+        left, right = x >> shift, x & self.mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ (_mix(right ^ round_key) & self.mask)
+        return (left << shift) | right
+
+    def __call__(self, indices):
+        """Позиции для массива индексов (int64) из диапазона 0..size-1."""
+        indices = np.asarray(indices, dtype=np.int64)
+        # Прогулка по циклу завершается только для индексов из домена перестановки
+        if indices.size and (indices.min() < 0 or indices.max() >= self.size):
+            raise ValueError(f"Индексы перестановки должны быть от 0 до {self.size - 1}!")
+        positions = self._encrypt(indices.astype(np.uint64))
+        # Домен не больше 4 * size, поэтому в среднем хватает нескольких проходов
+        outside = np.flatnonzero(positions >= self.size)
+        while len(outside):
+            positions[outside] = self._encrypt(positions[outside])
+            outside = outside[positions[outside] >= self.size]
+        return positions.astype(np.int64)
@@ -1,17 +1,23 @@
-import wave
-import numpy as np
 import os
+import time
+import numpy as np
+import shutil
+from bitpack import to_groups, from_groups, iter_groups
+from scatter import FeistelPermutation
+from compression import CODECS, compress, decompress
+from container import FLAG_TEXT, FLAG_ENCRYPTED, CODEC_SHIFT, HEADER_SIZE, pack_header, build_header, parse_header, check_payload
+from crypto import encrypt_stream, decrypt_stream, encrypted_size
+from metrics import compare_samples, remember_comparison
+from resultcache import new_hasher
+from tracing import NULL_TRACE
+from wavmap import read_wav_header, open_samples, lsb_bytes, samples_to_float
 
 INPUT_DIR = "template/input"
 OUTPUT_DIR = "template/output"
-LOG_FILE = "log_simple.txt"
-
-
-def log_sample_info(i, original_sample, cleared_bits, new_bits, modified_sample):
-    """Запись информации о сэмплах в лог-файл."""
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(
-            f"Сэмпл {i}: исходное={original_sample}, cleared_bits={cleared_bits}, new_bits={new_bits}, результат={modified_sample}\n")
+HEADER_SAMPLES = HEADER_SIZE * 8
+CHUNK_SAMPLES = 1 << 16
+# Блок копирования исходного файла при отображении прогресса
+COPY_CHUNK = 1 << 24
 
 
 def read_txt_file(txt_path):
@@ -23,137 +29,336 @@ def read_txt_file(txt_path):
         raise ValueError(f"Ошибка при чтении файла {txt_path}: {e}")
 
 
-def hide_message(input_wav_path, output_wav_path, message, num_bits=1):
-    """Шифрование сообщения в WAV-файл с заменой num_bits младших битов."""
+def lsb_capacity(params, num_bits, channels=None):
+    """Максимальный размер сообщения в байтах для LSB с num_bits битами (только по заголовку WAV)."""
+    carrier_size = params["nframes"] * len(_select_channels(params, channels))
+    return max(0, (carrier_size - HEADER_SAMPLES) * num_bits // 8)
+
+
+def _embed_plan(header, payload, num_bits):
+    """Блоки (значения, маска) для записи подряд: заголовок по 1 биту на сэмпл, затем сообщение
+    по num_bits битов, не больше CHUNK_SAMPLES сэмплов в блоке (упаковка идёт потоком)."""
+    yield to_groups(header, 1), np.uint8(0xFF ^ 1)
+    mask = np.uint8(0xFF ^ ((1 << num_bits) - 1))
+    for values in iter_groups(payload, num_bits, chunk_bytes=CHUNK_SAMPLES * num_bits // 8):
+        yield values, mask
+
+
+def _select_channels(params, channels):
+    """Проверка списка каналов для встраивания (None — все каналы по очереди)."""
+    if channels is None:
+        return list(range(params["nchannels"]))
+    channels = list(channels)
+    if not channels or len(set(channels)) != len(channels) or \
+            not all(0 <= channel < params["nchannels"] for channel in channels):
+        raise ValueError(f"Некорректный список каналов {channels} для файла с {params['nchannels']} каналами!")
+    return channels
+
+
+def _sample_values(samples, params):
+    """Целые значения сэмплов для трассировки (float PCM — битовое представление int32)."""
+    if params["format"] == "float":
+        return np.ascontiguousarray(samples).view('<i4').astype(np.int64)
+    return samples_to_float(samples, params).astype(np.int64)
+
+
+class _Carrier:
+    """Младшие байты сэмплов выбранных каналов в порядке «кадр за кадром» (без копирования файла)."""
+
+    def __init__(self, samples, params, channels):
+        self.channels = channels
+        self.params = params
+        self.frames = samples.reshape(params["nframes"], params["nchannels"], *samples.shape[1:])
+        self.lsb = lsb_bytes(samples).reshape(params["nframes"], params["nchannels"])
+        self.size = params["nframes"] * len(channels)
+
+    def _frames(self, start, stop):
+        width = len(self.channels)
+        return start // width, -(-stop // width), start % width
+
+    def read(self, start, stop):
+        """Копия младших байтов позиций start..stop."""
+        first, last, offset = self._frames(start, stop)
+        block = self.lsb[first:last][:, self.channels].ravel()
+        return block[offset:offset + stop - start]
+
+    def write(self, start, values):
+        """Запись младших байтов начиная с позиции start."""
+        first, last, offset = self._frames(start, start + len(values))
+        block = self.lsb[first:last][:, self.channels].ravel()
+        block[offset:offset + len(values)] = values
+        self.lsb[first:last, self.channels] = block.reshape(last - first, len(self.channels))
+
+    def _cells(self, positions):
+        width = len(self.channels)
+        return positions // width, np.asarray(self.channels)[positions % width]
+
+    def read_at(self, positions):
+        """Младшие байты произвольных позиций (читаются только эти сэмплы)."""
+        return self.lsb[self._cells(positions)]
+
+    def write_at(self, positions, values):
+        self.lsb[self._cells(positions)] = values
+
+    def values_at(self, positions):
+        """Полные значения сэмплов произвольных позиций (для трассировки)."""
+        return _sample_values(self.frames[self._cells(positions)], self.params)
+
+    def values(self, start, stop):
+        return self.values_at(np.arange(start, stop))
+
+
+class _ScatteredCarrier:
+    """Носитель с ключевой перестановкой позиций: логическая позиция i -> сэмпл permutation(i)."""
+
+    def __init__(self, carrier, key):
+        if carrier.size < HEADER_SAMPLES:
+            raise ValueError("Файл слишком короткий для заголовка сообщения!")
+        self.carrier = carrier
+        self.size = carrier.size
+        self.permutation = FeistelPermutation(carrier.size, key)
+
+    def read(self, start, stop):
+        return self.carrier.read_at(self.permutation(np.arange(start, stop)))
+
+    def write(self, start, values):
+        self.carrier.write_at(self.permutation(np.arange(start, start + len(values))), values)
+
+    def values(self, start, stop):
+        return self.carrier.values_at(self.permutation(np.arange(start, stop)))
+
+
+def _open_carrier(samples, params, channels, key):
+    carrier = _Carrier(samples, params, channels)
+    return carrier if key is None else _ScatteredCarrier(carrier, key)
+
+
+def _copy_file(src_path, dst_path, progress=None):
+    """Копирование файла; с progress — блоками по COPY_CHUNK с вызовом progress("copy", байт, всего)."""
+    if progress is None:
+        shutil.copyfile(src_path, dst_path)
+        return
+    total = os.path.getsize(src_path)
+    done = 0
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        while True:
+            chunk = src.read(COPY_CHUNK)
+            if not chunk:
+                break
+            dst.write(chunk)
+            done += len(chunk)
+            progress("copy", done, total)
+
+
+def hide_message(input_wav_path, output_wav_path, message, num_bits=1, trace=None, channels=None, key=None,
+                 password=None, compression="auto", progress=None, result_cache=None):
+    """Шифрование сообщения (str или bytes) в WAV-файл с заменой num_bits младших битов.
+
+    Первые HEADER_SAMPLES сэмплов хранят заголовок контейнера по одному биту на сэмпл,
+    далее идёт полезная нагрузка с num_bits битами на сэмпл. Исходный файл копируется
+    целиком, после чего в копии через np.memmap изменяются только сэмплы сообщения.
+    Поддерживаются 8-битный беззнаковый, 16/24/32-битный целый и 32-битный float PCM:
+    изменяется только младший байт каждого сэмпла.
+    channels — список каналов для встраивания (None — все каналы поочерёдно).
+    key — ключ (str или bytes) для рассеивания заголовка и сообщения по всему файлу
+    ключевой перестановкой позиций (None — запись подряд с начала файла).
+    password — пароль для аутентифицированного шифрования сообщения (crypto.py); сообщение
+    шифруется блоками по мере записи сэмплов.
+    compression — алгоритм сжатия перед шифрованием ("auto" — выбор по пробе сообщения,
+    "none", "zlib", "bz2", "lzma"); выбранный алгоритм и его цена попадают в статистику.
+    Сообщения больше compression.MAX_DECOMPRESSED_SIZE не сжимаются ("auto") или отвергаются
+    (явный алгоритм): иначе их нельзя было бы извлечь.
+    trace — необязательный tracing.Trace для замера фаз и записи первых сэмплов.
+    progress — необязательный progress(этап, сделано, всего), вызывается после каждого блока
+    на этапах "copy", "embed" и "stats"; исключение из него прерывает встраивание.
+    result_cache — необязательный resultcache.ResultCache: отпечатки обоих файлов считаются
+    на этапе "stats" и вместе с метриками сохраняются для последующих анализа и извлечения.
+    """
     if not 1 <= num_bits <= 8:
         raise ValueError("num_bits должен быть от 1 до 8!")
+    trace = trace or NULL_TRACE
 
-    # Чтение WAV-файла
-    with wave.open(input_wav_path, 'rb') as wav:
-        params = wav.getparams()
-        print(f"Параметры файла {input_wav_path}: {params}")
-        if params.sampwidth != 2:
-            raise ValueError(f"Файл {input_wav_path} не в формате 16 бит!")
-        frames = wav.readframes(wav.getnframes())
-        samples = np.frombuffer(frames, dtype=np.int16)
-
-    # Проверка диапазона сэмплов
-    print(f"Исходные сэмплы: min={np.min(samples)}, max={np.max(samples)}")
-    if np.max(np.abs(samples)) > 32767:
-        raise ValueError(f"Сэмплы в {input_wav_path} вне диапазона int16!")
+    with trace.phase("read"):
+        params = read_wav_header(input_wav_path)
+        trace.set_info(input=input_wav_path, output=output_wav_path, num_bits=num_bits, params=params)
+        channels = _select_channels(params, channels)
+        samples = open_samples(input_wav_path, header=params)
+        total_samples = len(samples)
 
     # Подготовка сообщения
-    message += '\0'
-    bits = ''.join(format(ord(char), '08b') for char in message)
-    required_samples = len(bits) // num_bits + (1 if len(bits) % num_bits else 0)
-
-    # Проверка доступного количества символов
-    available_chars = (len(samples) * num_bits) // 8
-    if len(message) > available_chars:
-        raise ValueError(f"Сообщение слишком длинное! Максимум {available_chars} символов для {num_bits} битов.")
-
-    if required_samples > len(samples):
-        raise ValueError(f"Сообщение слишком длинное для файла {input_wav_path} с {num_bits} битами на сэмпл!")
-
-    # Очистка лог-файла
-    if os.path.exists(LOG_FILE):
-        os.remove(LOG_FILE)
-
-    # Модификация сэмплов
-    modified_samples = samples.copy().astype(np.int16)
-    bit_index = 0
-    changed_samples = 0
-    for i in range(len(modified_samples)):
-        if bit_index >= len(bits):
+    with trace.phase("pack"):
+        if isinstance(message, str):
+            payload, flags = message.encode('utf-8'), FLAG_TEXT
+        else:
+            payload, flags = bytes(message), 0
+        payload_size = len(payload)
+        compress_start = time.perf_counter()
+        codec, payload = compress(payload, compression)
+        compress_time = time.perf_counter() - compress_start
+        flags |= CODECS[codec][0] << CODEC_SHIFT
+        if password is None:
+            header = pack_header(payload, num_bits, flags)
+            stored, stored_size = payload, len(payload)
+        else:
+            stored, stored_size = encrypt_stream(password, payload), encrypted_size(len(payload))
+            header = build_header(stored_size, 0, num_bits, flags | FLAG_ENCRYPTED)
+        required_samples = HEADER_SAMPLES + -(-stored_size * 8 // num_bits)
+
+    # Проверка доступного количества байтов
+    available_chars = lsb_capacity(params, num_bits, channels)
+    # lsb_capacity обрезается до 0: пустое сообщение должно не помещаться и в файл короче заголовка
+    if stored_size > available_chars or required_samples > params["nframes"] * len(channels):
+        raise ValueError(f"Сообщение слишком длинное! Максимум {available_chars} байт для {num_bits} битов.")
+
+    with trace.phase("write"):
+        _copy_file(input_wav_path, output_wav_path, progress)
+        modified_samples = open_samples(output_wav_path, 'r+', header=params)
+
+    source = _open_carrier(samples, params, channels, key)
+    target = _open_carrier(modified_samples, params, channels, key)
+    start = 0
+    plan = _embed_plan(header, stored, num_bits)
+    while True:
+        # Упаковка (и шифрование) следующего блока идёт вперемешку с записью сэмплов
+        with trace.phase("pack"):
+            block = next(plan, None)
+        if block is None:
             break
-        original_sample = modified_samples[i]
-        mask = np.int16(~((1 << num_bits) - 1))
-        cleared_bits = original_sample & mask
-        new_bits = 0
-        for j in range(num_bits - 1, -1, -1):
-            if bit_index < len(bits):
-                new_bits |= (int(bits[bit_index]) << j)
-                bit_index += 1
-            else:
-                break
-        new_bits = np.int16(new_bits)
-        modified_sample = cleared_bits | new_bits
+        values, mask = block
+        end = start + len(values)
+        with trace.phase("embed"):
+            original = source.read(start, end)
+            modified = (original & mask) | values
+            target.write(start, modified)
+        if trace.enabled:
+            # В трассировку — полные значения сэмплов и маска сохраняемых битов во всю ширину
+            count = min(len(values), trace.max_samples)
+            kept = ~(0xFF ^ int(mask))
+            trace.record_samples(start, source.values(start, start + count), np.full(count, kept),
+                                 target.values(start, start + count))
+        start = end
+        if progress is not None:
+            progress("embed", start, required_samples)
 
-        if i < 100:
-            log_sample_info(i, original_sample, cleared_bits, new_bits, modified_sample)
+    # Сэмплы после последнего изменённого кадра не менялись
+    with trace.phase("stats"):
+        touched = min(total_samples, -(-required_samples // len(channels)) * params["nchannels"])
+        if key is not None:
+            touched = total_samples  # Позиции рассеяны по всему файлу
+        hashers = (new_hasher(), new_hasher()) if result_cache is not None else None
+        stats = compare_samples(samples, modified_samples, params, changed_count=touched, progress=progress,
+                                hashers=hashers)
 
-        if modified_sample != original_sample:
-            changed_samples += 1
-        if modified_sample > 32767 or modified_sample < -32768:
-            raise ValueError(f"Переполнение int16 на сэмпле {i}: {modified_sample}")
-        modified_samples[i] = modified_sample
+    with trace.phase("write"):
+        modified_samples.flush()
+        del modified_samples
 
-    print(f"Изменённые сэмплы: min={np.min(modified_samples)}, max={np.max(modified_samples)}")
+    if result_cache is not None:
+        # После записи на диск: отпечаток привязывается к итоговым mtime и размеру файла
+        remember_comparison(result_cache, input_wav_path, output_wav_path, hashers, stats)
 
-    # Запись результата
-    with wave.open(output_wav_path, 'wb') as wav_out:
-        wav_out.setparams(params)
-        wav_out.writeframes(modified_samples.tobytes())
+    stats.update({
+        "available_chars": available_chars,
+        "codec": codec,
+        "payload_bytes": payload_size,
+        "stored_bytes": stored_size,
+        "compress_time": compress_time
+    })
+    trace.set_info(stats=stats)
+    trace.finish()
+    return stats
 
-    # Анализ разницы
-    max_diff = np.max(np.abs(modified_samples - samples))
-    mean_diff = np.mean(np.abs(modified_samples - samples))
-    signal_power = np.mean(samples.astype(np.float64) ** 2)
-    noise_power = np.mean((modified_samples - samples).astype(np.float64) ** 2)
-    snr = 10 * np.log10(signal_power / noise_power) if noise_power > 0 else float('inf')
-    changed_percent = (changed_samples / len(samples)) * 100 if len(samples) > 0 else 0
 
-    return {
-        "max_diff": max_diff,
-        "mean_diff": mean_diff,
-        "snr": snr,
-        "changed_samples": changed_samples,
-        "changed_percent": changed_percent,
-        "available_chars": available_chars
-    }
+def _iter_bytes(carrier, start, count, num_bits, progress=None):
+    """Блоки из count байтов, записанных с num_bits битами на сэмпл начиная с позиции start.
 
+    Сэмплы читаются по CHUNK_SAMPLES (кратно 8), поэтому байты не разрываются между блоками.
+    progress("extract", сэмплов, всего) вызывается после каждого блока.
+    """
+    needed = -(-count * 8 // num_bits)
+    if start + needed > carrier.size:
+        raise ValueError("Файл обрезан: сообщение неполное!")
+    mask = (1 << num_bits) - 1
+    remaining = count
+    for chunk_start in range(start, start + needed, CHUNK_SAMPLES):
+        chunk = carrier.read(chunk_start, min(chunk_start + CHUNK_SAMPLES, start + needed))
+        data = from_groups(chunk & mask, num_bits, count=min(remaining, len(chunk) * num_bits // 8))
+        remaining -= len(data)
+        if progress is not None:
+            progress("extract", chunk_start + len(chunk) - start, needed)
+        yield data
 
-def extract_message(input_wav_path, num_bits=1):
-    """Извлечение сообщения из WAV-файла с учётом num_bits."""
-    if not 1 <= num_bits <= 8:
+
+def _extract_bytes(carrier, start, count, num_bits):
+    """Извлечение count байтов, записанных с num_bits битами на сэмпл начиная с позиции start."""
+    return b"".join(_iter_bytes(carrier, start, count, num_bits))
+
+
+def extract_message(input_wav_path, num_bits=None, trace=None, channels=None, key=None, password=None,
+                    progress=None):
+    """Извлечение сообщения из WAV-файла.
+
+    Сначала читается заголовок, затем ровно те сэмплы, которые занимает сообщение
+    (через np.memmap, остальной файл не читается).
+    Если num_bits задан, он должен совпадать со значением из заголовка.
+    channels и key должны совпадать с использованными при встраивании.
+    password нужен для зашифрованных сообщений: неверный пароль отбрасывается по первому блоку.
+    progress — необязательный progress("extract", сэмплов, всего) после каждого блока.
+    Возвращает str для текстовых сообщений и bytes для двоичных.
+    """
+    if num_bits is not None and not 1 <= num_bits <= 8:
         raise ValueError("num_bits должен быть от 1 до 8!")
+    trace = trace or NULL_TRACE
 
-    with wave.open(input_wav_path, 'rb') as wav:
-        frames = wav.readframes(wav.getnframes())
-        samples = np.frombuffer(frames, dtype=np.int16)
-
-    bits = ''
-    for sample in samples:
-        for j in range(num_bits - 1, -1, -1):
-            bits += str((sample >> j) & 1)
-
-    message = ''
-    for i in range(0, len(bits), 8):
-        byte = bits[i:i + 8]
-        if len(byte) == 8:
-            char = chr(int(byte, 2))
-            if char == '\0':
-                break
-            message += char
-    return message
+    with trace.phase("read"):
+        params = read_wav_header(input_wav_path)
+        samples = open_samples(input_wav_path, header=params)
+        carrier = _open_carrier(samples, params, _select_channels(params, channels), key)
+        if carrier.size < HEADER_SAMPLES:
+            raise ValueError("Файл не содержит скрытого сообщения!")
+        header = parse_header(_extract_bytes(carrier, 0, HEADER_SIZE, 1))
+        trace.set_info(input=input_wav_path, header=header)
+    if num_bits is not None and header["num_bits"] != num_bits:
+        raise ValueError(f"Сообщение записано с {header['num_bits']} битами на сэмпл, а не с {num_bits}!")
 
+    with trace.phase("extract"):
+        blocks = _iter_bytes(carrier, HEADER_SAMPLES, header["length"], header["num_bits"], progress)
+        if header["flags"] & FLAG_ENCRYPTED:
+            if password is None:
+                raise ValueError("Сообщение зашифровано: нужен пароль!")
+            payload = b"".join(decrypt_stream(password, blocks, header["length"]))
+        else:
+            payload = b"".join(blocks)
+            check_payload(header, payload)
+        if header["codec"]:
+            payload = decompress(payload, header["codec"])
+    trace.finish()
+    if header["flags"] & FLAG_TEXT:
+        return payload.decode('utf-8')
+    return payload
 
-def get_wav_info(wav_path):
-    """Получение информации о WAV-файле."""
-    with wave.open(wav_path, 'rb') as wav:
-        params = wav.getparams()
-        nframes = params.nframes
-        nchannels = params.nchannels
-        sampwidth = params.sampwidth
-        framerate = params.framerate
 
-        total_samples = nframes * nchannels
-        total_bits = total_samples * sampwidth * 8
+def get_wav_info(wav_path, params=None):
+    """Получение информации о WAV-файле (по RIFF-заголовку, без чтения сэмплов).
+
+    params — уже прочитанный заголовок (например, из capacity.HeaderIndex).
+    """
+    if params is None:
+        params = read_wav_header(wav_path)
+    nframes = params["nframes"]
+    nchannels = params["nchannels"]
+    sampwidth = params["sampwidth"]
+    framerate = params["framerate"]
+
+    total_samples = nframes * nchannels
+    total_bits = total_samples * sampwidth * 8
 
     return {
         "total_samples": total_samples,
         "total_bits": total_bits,
         "nchannels": nchannels,
+        "sampwidth": sampwidth,
+        "format": params["format"],
         "framerate": framerate,
         "duration": nframes / framerate
-    }
\ No newline at end of file
+    }
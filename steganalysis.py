@@ -0,0 +1,297 @@
+"""Слепое обнаружение LSB-встраивания без исходного файла: хи-квадрат, RS и анализ пар сэмплов.
+
+Файл читается блоками через np.memmap; каждый детектор копит только счётчики (гистограмма
+младших битов, числа регулярных/сингулярных групп, классы пар сэмплов), поэтому память
+не зависит от длины файла. Группы и пары берутся внутри каждого канала.
+
+- Хи-квадрат (Westfeld, Pfitzmann): при встраивании частоты пар значений (2k, 2k+1)
+  выравниваются; chi_square_p близко к 1 — признак встраивания.
+- RS (Fridrich, Goljan, Du): оценка доли изменённых младших битов по отклику групп
+  из 4 сэмплов на инверсию младшего бита.
+- SPA (Dumitrescu, Wu, Wang): оценка той же доли по классам соседних пар сэмплов.
+
+RS и SPA опираются на гладкость сигнала в масштабе младшего бита. Её мера — доля соседних
+пар, совпадающих без учёта младшего бита (smooth_fraction, не меняется при встраивании);
+если она меньше MIN_SMOOTH_FRACTION (громкий шумоподобный сигнал), оценки RS и SPA
+неустойчивы и не возвращаются, а вывод делается по хи-квадрат. Хи-квадрат срабатывает и на
+чистых файлах с гладкой гистограммой (например, синусоида), поэтому при надёжных RS и SPA
+он в вывод не входит, а сам по себе подтверждается оценкой по наклону гистограммы
+(histogram_rate): в чистом файле разность частот 2k+1 и 2k следует наклону сумм пар
+(суммы встраивание не меняет), а встраивание её гасит. Если наклон не выше шума в
+MIN_SLOPE_SNR раз (широкая гистограмма реальной записи, например research/audio/Sample_general.wav),
+оценка по наклону ничего не различает и не возвращается. Хи-квадрат на такой гистограмме
+близок к 1 и без встраивания, поэтому файл не считается подозрительным, но если хи-квадрат
+выше порога, результат помечается как неопределённый (inconclusive).
+
+Кроме оценок по всему файлу считаются оценки по окнам из BLOCK_SAMPLES сэмплов: файл
+подозрителен по окнам, если таких окон не меньше MIN_SUSPICIOUS_FRACTION от всех
+и не меньше MIN_SUSPICIOUS_BLOCKS.
+"""
+import math
+
+import numpy as np
+
+from wavmap import read_wav_header, open_samples, samples_to_float
+
+CHUNK_FRAMES = 1 << 16
+# Окно для оценок по частям файла (сэмплов одного канала)
+BLOCK_SAMPLES = 1 << 18
+# Младшие биты значения, по которым строится гистограмма хи-квадрат
+HISTOGRAM_BITS = 16
+# Пары значений с меньшей ожидаемой частотой в хи-квадрат не учитываются
+MIN_EXPECTED = 5
+GROUP_SIZE = 4
+RS_MASK = np.array([0, 1, 1, 0], dtype=bool)
+# Пороги: p хи-квадрат и оценённая доля изменённых младших битов
+CHI_SQUARE_THRESHOLD = 0.99
+RATE_THRESHOLD = 0.05
+# Минимальная доля пар из одного класса пар значений, при которой RS и SPA надёжны
+MIN_SMOOTH_FRACTION = 0.02
+# Нижняя граница оценки по наклону гистограммы: оценка минус столько стандартных ошибок
+RATE_CONFIDENCE = 2.0
+# Минимальное отношение дисперсии наклона гистограммы к её шуму, при котором оценка по наклону
+# различает чистый файл и встраивание
+MIN_SLOPE_SNR = 2.0
+# Доля и число подозрительных окон, при которых подозрителен весь файл (одно окно —
+# ещё не признак: RS и SPA на отдельных окнах шумят)
+MIN_SUSPICIOUS_FRACTION = 0.2
+MIN_SUSPICIOUS_BLOCKS = 2
+
+# Классы пар сэмплов для SPA
+PAIR_Z, PAIR_X, PAIR_W, PAIR_V = range(4)
+
+
+def _chi_square_sf(chi2, df):
+    """P(χ² ≥ chi2) для df степеней свободы (приближение Уилсона — Хилферти)."""
+    if df <= 0:
+        return 1.0
+    scale = 2 / (9 * df)
+    z = ((chi2 / df) ** (1 / 3) - (1 - scale)) / math.sqrt(scale)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def chi_square_p(histogram):
+    """Вероятность встраивания по гистограмме значений: близко к 1, если пары (2k, 2k+1) выровнены."""
+    even, odd = histogram[0::2].astype(np.float64), histogram[1::2].astype(np.float64)
+    expected = (even + odd) / 2
+    used = expected >= MIN_EXPECTED
+    if used.sum() < 2:
+        return None
+    chi2 = float(np.sum((even[used] - expected[used]) ** 2 / expected[used]))
+    return _chi_square_sf(chi2, int(used.sum()) - 1)
+
+
+def histogram_rate(histogram):
+    """Доля изменённых младших битов по наклону гистограммы и её стандартная ошибка.
+
+    Разность частот 2k+1 и 2k сравнивается с наклоном сумм соседних пар (T[k+1] - T[k-1]) / 8:
+    в чистом файле она ему равна, при доле q изменённых сэмплов уменьшается в (1 - q) раз.
+    Из суммы квадратов наклонов вычитается их шумовая дисперсия; (None, None), если наклон
+    не превышает шум в MIN_SLOPE_SNR раз: тогда оценка ничего не различает (на широкой
+    гистограмме реальной записи она около 1 и в чистом файле, и после встраивания).
+    """
+    histogram = histogram.astype(np.float64)
+    totals = histogram[0::2] + histogram[1::2]
+    difference = (histogram[1::2] - histogram[0::2])[1:-1]
+    slope = (totals[2:] - totals[:-2]) / 8
+    noise = float(np.sum(totals[2:] + totals[:-2])) / 64
+    signal = float(np.sum(slope * slope)) - noise
+    if signal <= 0 or signal < MIN_SLOPE_SNR * noise:
+        return None, None
+    beta = float(np.sum(difference * slope)) / signal
+    error = math.sqrt(float(np.sum(slope * slope * totals[1:-1]))) / signal
+    return 1 - beta, error
+
+
+def _smaller_root(a, b, c):
+    """Меньший по модулю корень a·x² + b·x + c = 0 (None, если вещественных корней нет)."""
+    if a == 0:
+        return -c / b if b else None
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return None
+    roots = ((-b + math.sqrt(discriminant)) / (2 * a), (-b - math.sqrt(discriminant)) / (2 * a))
+    return min(roots, key=abs)
+
+
+def _flip(values):
+    """F1: 2k <-> 2k+1."""
+    return values ^ 1
+
+
+def _flip_shifted(values):
+    """F-1: 2k-1 <-> 2k."""
+    return ((values + 1) ^ 1) - 1
+
+
+def _smoothness(groups):
+    return np.abs(np.diff(groups, axis=1)).sum(axis=1)
+
+
+def rs_counts(groups):
+    """Счётчики RS для матрицы групп (группы, GROUP_SIZE).
+
+    Порядок: R_M, S_M, R_-M, S_-M для групп как есть и для групп с инвертированными младшими битами.
+    """
+    counts = []
+    for source in (groups, _flip(groups)):
+        base = _smoothness(source)
+        for flip in (_flip, _flip_shifted):
+            flipped = source.copy()
+            flipped[:, RS_MASK] = flip(source[:, RS_MASK])
+            changed = _smoothness(flipped)
+            counts += [int(np.count_nonzero(changed > base)), int(np.count_nonzero(changed < base))]
+    return np.array(counts, dtype=np.int64)
+
+
+def rs_rate(counts):
+    """Доля изменённых младших битов по счётчикам rs_counts (None, если оценка невозможна)."""
+    r_m, s_m, r_nm, s_nm, r_m1, s_m1, r_nm1, s_nm1 = (float(value) for value in counts)
+    d0, d1 = r_m - s_m, r_m1 - s_m1
+    dn0, dn1 = r_nm - s_nm, r_nm1 - s_nm1
+    z = _smaller_root(2 * (d1 + d0), dn0 - dn1 - d1 - 3 * d0, d0 - dn0)
+    if z is None or z == 0.5:
+        return None
+    return z / (z - 0.5)
+
+
+def pair_counts(first, second):
+    """Число пар соседних сэмплов в классах Z, X, W, V (np.bincount по коду класса)."""
+    equal = first == second
+    second_even = (second & 1) == 0
+    x = (second_even & (first < second)) | (~second_even & (first > second))
+    w = ~equal & ~x & ((first >> 1) == (second >> 1))
+    codes = np.where(equal, PAIR_Z, np.where(x, PAIR_X, np.where(w, PAIR_W, PAIR_V)))
+    return np.bincount(codes, minlength=4).astype(np.int64)
+
+
+def spa_rate(counts):
+    """Доля изменённых младших битов по классам пар (None, если оценка невозможна)."""
+    z, x, w, v = (float(value) for value in counts)
+    total = z + x + w + v
+    if total == 0:
+        return None
+    y = w + v
+    return _smaller_root((w + z) / 2, 2 * x - total, y - x)
+
+
+class LSBDetector:
+    """Накопитель счётчиков всех детекторов: update() для каждого блока сэмплов (кадры, каналы)."""
+
+    def __init__(self, histogram_bits=HISTOGRAM_BITS):
+        self.value_mask = (1 << histogram_bits) - 1
+        self.histogram = np.zeros(1 << histogram_bits, dtype=np.int64)
+        self.rs = np.zeros(8, dtype=np.int64)
+        self.pairs = np.zeros(4, dtype=np.int64)
+
+    def update(self, frames):
+        """frames — целые значения сэмплов, матрица (кадры, каналы)."""
+        self.histogram += np.bincount((frames & self.value_mask).ravel(), minlength=len(self.histogram))
+        for channel in frames.T:
+            usable = len(channel) // GROUP_SIZE * GROUP_SIZE
+            if usable:
+                self.rs += rs_counts(channel[:usable].reshape(-1, GROUP_SIZE))
+            self.pairs += pair_counts(channel[:-1], channel[1:])
+
+    def merge(self, other):
+        self.histogram += other.histogram
+        self.rs += other.rs
+        self.pairs += other.pairs
+
+    def result(self):
+        total_pairs = int(self.pairs.sum())
+        smooth_fraction = (self.pairs[PAIR_Z] + self.pairs[PAIR_W]) / total_pairs if total_pairs else 0.0
+        reliable = smooth_fraction >= MIN_SMOOTH_FRACTION
+        rate, error = histogram_rate(self.histogram)
+        return {
+            "chi_square_p": chi_square_p(self.histogram),
+            "histogram_rate": rate,
+            "histogram_rate_error": error,
+            "rs_rate": rs_rate(self.rs) if reliable else None,
+            "spa_rate": spa_rate(self.pairs) if reliable else None,
+            "smooth_fraction": float(smooth_fraction)
+        }
+
+
+def _suspicious(scores):
+    """Признак встраивания: обе оценки RS и SPA выше порога, а если они ненадёжны — хи-квадрат,
+    подтверждённый оценкой по наклону гистограммы (с запасом RATE_CONFIDENCE ошибок)."""
+    chi_p, rs, spa = scores["chi_square_p"], scores["rs_rate"], scores["spa_rate"]
+    if rs is not None and spa is not None:
+        return rs > RATE_THRESHOLD and spa > RATE_THRESHOLD
+    rate, error = scores["histogram_rate"], scores["histogram_rate_error"]
+    return chi_p is not None and chi_p > CHI_SQUARE_THRESHOLD and \
+        rate is not None and rate - RATE_CONFIDENCE * error > RATE_THRESHOLD
+
+
+def _inconclusive(scores):
+    """Хи-квадрат видит выравнивание пар, но проверить его нечем: RS и SPA ненадёжны, а наклон
+    гистограммы тонет в шуме. Встраивание и гладкая гистограмма тут неразличимы."""
+    chi_p = scores["chi_square_p"]
+    return (scores["rs_rate"] is None or scores["spa_rate"] is None) and \
+        chi_p is not None and chi_p > CHI_SQUARE_THRESHOLD and scores["histogram_rate"] is None
+
+
+def _iter_frames(wav_path, params):
+    """Блоки целых значений сэмплов (кадры, каналы) по CHUNK_FRAMES кадров."""
+    samples = open_samples(wav_path, header=params)
+    nchannels = params["nchannels"]
+    step = CHUNK_FRAMES * nchannels
+    for start in range(0, len(samples), step):
+        values = samples_to_float(samples[start:start + step], params).astype(np.int64)
+        yield values[:len(values) // nchannels * nchannels].reshape(-1, nchannels)
+
+
+def analyze_file(wav_path, block_samples=BLOCK_SAMPLES):
+    """Оценки всех детекторов по файлу и по окнам из block_samples кадров.
+
+    Возвращает оценки по всему файлу, число окон, число подозрительных окон, индекс первого
+    из них и итоговый признак suspicious: по всему файлу или по подозрительным окнам (не меньше
+    MIN_SUSPICIOUS_FRACTION от всех и не меньше MIN_SUSPICIOUS_BLOCKS). inconclusive — файл не
+    подозрителен, но только потому, что выравнивание пар по хи-квадрат нечем проверить.
+    """
+    params = read_wav_header(wav_path)
+    if params["format"] != "int":
+        raise ValueError("Стегоанализ младших битов поддерживает только целочисленный PCM!")
+    histogram_bits = min(HISTOGRAM_BITS, params["sampwidth"] * 8)
+    total = LSBDetector(histogram_bits)
+    block = LSBDetector(histogram_bits)
+    block_frames = 0
+    blocks = suspicious_blocks = 0
+    first_suspicious = None
+
+    def close_block():
+        nonlocal blocks, suspicious_blocks, first_suspicious, block, block_frames
+        # Короткий остаток в конце файла учитывается только в общей оценке
+        if block_frames >= block_samples // 4 or blocks == 0:
+            if _suspicious(block.result()):
+                suspicious_blocks += 1
+                if first_suspicious is None:
+                    first_suspicious = blocks
+            blocks += 1
+        total.merge(block)
+        block, block_frames = LSBDetector(histogram_bits), 0
+
+    for frames in _iter_frames(wav_path, params):
+        while len(frames):
+            take = min(len(frames), block_samples - block_frames)
+            block.update(frames[:take])
+            block_frames += take
+            frames = frames[take:]
+            if block_frames == block_samples:
+                close_block()
+    if block_frames:
+        close_block()
+
+    scores = total.result()
+    suspicious = _suspicious(scores) or \
+        suspicious_blocks >= max(MIN_SUSPICIOUS_BLOCKS, MIN_SUSPICIOUS_FRACTION * blocks)
+    return {
+        **scores,
+        "blocks": blocks,
+        "suspicious_blocks": suspicious_blocks,
+        "first_suspicious_block": first_suspicious,
+        "block_seconds": block_samples / params["framerate"],
+        "suspicious": suspicious,
+        "inconclusive": not suspicious and _inconclusive(scores)
+    }
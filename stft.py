@@ -0,0 +1,53 @@
+"""Потоковое кратковременное преобразование Фурье моно-сигнала WAV-файла.
+
+Файл читается через np.memmap блоками по CHUNK_FRAMES кадров, каналы усредняются.
+Кадры STFT — представления sliding_window_view над буфером блока (без копирования),
+спектры считаются пакетным rfft по всем кадрам блока. Хвост блока, не вошедший
+в полный кадр, переносится в следующий блок, поэтому память не зависит от длины файла.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from wavmap import read_wav_header, open_samples, samples_to_float
+
+CHUNK_FRAMES = 1 << 16
+DEFAULT_WINDOW = 2048
+DEFAULT_HOP = 1024
+
+
+def iter_mono(wav_path, header=None, chunk_frames=CHUNK_FRAMES):
+    """Блоки моно-сигнала float64 (среднее по каналам) по chunk_frames кадров."""
+    if header is None:
+        header = read_wav_header(wav_path)
+    samples = open_samples(wav_path, header=header)
+    nchannels = header["nchannels"]
+    step = chunk_frames * nchannels
+    for start in range(0, header["nframes"] * nchannels, step):
+        block = samples_to_float(samples[start:start + step], header)
+        yield block.reshape(-1, nchannels).mean(axis=1)
+
+
+def iter_frames(wav_path, window=DEFAULT_WINDOW, hop=DEFAULT_HOP, header=None):
+    """Пакеты кадров STFT: матрицы (кадры, window) с шагом hop сэмплов между кадрами."""
+    if hop <= 0 or window <= 0:
+        raise ValueError("Размер окна и шаг должны быть положительными!")
+    carry = np.zeros(0)
+    # При hop > window следующий кадр может начинаться за концом буфера: пропуск переносится
+    skip = 0
+    for block in iter_mono(wav_path, header, max(CHUNK_FRAMES, window)):
+        if skip >= len(block):
+            skip -= len(block)
+            continue
+        buffer = np.concatenate([carry, block[skip:]])
+        count = (len(buffer) - window) // hop + 1 if len(buffer) >= window else 0
+        if count:
+            yield sliding_window_view(buffer, window)[::hop][:count]
+        skip = max(0, count * hop - len(buffer))
+        carry = buffer[count * hop:]
+
+
+def iter_spectra(wav_path, window=DEFAULT_WINDOW, hop=DEFAULT_HOP, header=None):
+    """Пакеты амплитудных спектров кадров с окном Ханна: матрицы (кадры, window // 2 + 1)."""
+    taper = np.hanning(window)
+    for frames in iter_frames(wav_path, window, hop, header):
+        yield np.abs(np.fft.rfft(frames * taper, axis=1))
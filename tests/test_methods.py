@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from methods import Encoder, SignalEncoder, get_encoder
+from wavmap import read_wav_header
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "research", "audio", "Sample_general.wav")
+
+
+@pytest.mark.parametrize("method, options", [
+    ("lsb", {}),
+    ("lsb-research", {}),
+    ("echo", {}),
+    ("echo", {"fec": True}),
+    ("phase", {}),
+    ("phase", {"fec": True}),
+])
+# Сообщения помещаются во все методы, включая эхо с FEC (10 байт на этом файле)
+@pytest.mark.parametrize("message", ["hello", "Мир!"])
+def test_registry_round_trip_on_sample(tmp_path, method, options, message):
+    encoder = get_encoder(method, **options)
+    output = str(tmp_path / "encoded.wav")
+    encoder.embed(SAMPLE, output, message)
+    assert encoder.extract(output, len(message.encode('utf-8'))) == message
+
+
+@pytest.mark.parametrize("options", [{}, {"fec": True}])
+def test_echo_round_trips_at_reported_capacity(tmp_path, options):
+    encoder = get_encoder("echo", **options)
+    capacity = encoder.capacity(read_wav_header(SAMPLE))
+    message = ("steganography " * capacity)[:capacity]
+    output = str(tmp_path / "encoded.wav")
+    encoder.embed(SAMPLE, output, message)
+    assert encoder.extract(output, capacity) == message
+    with pytest.raises(ValueError):
+        encoder.embed(SAMPLE, output, message + "x")
+
+
+def test_research_lsb_accepts_bytes_and_reports_capacity_in_bytes(tmp_path):
+    encoder = get_encoder("lsb-research")
+    output = str(tmp_path / "encoded.wav")
+    encoder.embed(SAMPLE, output, "Привет".encode('utf-8'))
+    assert encoder.extract(output) == "Привет"
+    capacity = encoder.capacity(read_wav_header(SAMPLE))
+    with pytest.raises(ValueError):
+        encoder.embed(SAMPLE, output, "ж" * (capacity // 2 + 1))
+
+
+def test_incomplete_encoder_cannot_be_created():
+    class NoExtract(Encoder):
+        def capacity(self, params):
+            return 0
+
+        def embed(self, input_wav_path, output_wav_path, message):
+            return {}
+
+    class NoSignal(SignalEncoder):
+        pass
+
+    for cls in (Encoder, SignalEncoder, NoExtract, NoSignal):
+        with pytest.raises(TypeError):
+            cls()
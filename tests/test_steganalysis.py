@@ -0,0 +1,80 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from service import hide_message, lsb_capacity
+from steganalysis import analyze_file
+from wavmap import read_wav_header
+
+FRAMERATE = 44100
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "research", "audio", "Sample_general.wav")
+
+
+def write_wav(path, samples, nchannels=1):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(nchannels)
+        wav.setsampwidth(2)
+        wav.setframerate(FRAMERATE)
+        wav.writeframes(np.clip(np.round(samples), -32768, 32767).astype('<i2').tobytes())
+
+
+def sinusoid(seconds, amplitude, frequency, noise=0.0, seed=0):
+    t = np.arange(FRAMERATE * seconds)
+    signal = amplitude * np.sin(2 * np.pi * frequency * t / FRAMERATE)
+    if noise:
+        signal += np.random.default_rng(seed).normal(0, noise, len(t))
+    return signal
+
+
+# Частота 3001.7 Гц не кратна частоте дискретизации: гистограмма гладкая, и хи-квадрат
+# выравнивание пар (2k, 2k+1) видит и без встраивания
+CLEAN_CARRIERS = {
+    "smooth-sinusoid": sinusoid(10, 8000, 3001.7),
+    "loud-smooth-sinusoid": sinusoid(10, 20000, 3001.7),
+    "quiet-sinusoid-with-noise": sinusoid(20, 200, 440, noise=20),
+    "sinusoid": sinusoid(10, 8000, 440),
+}
+
+
+@pytest.mark.parametrize("name", CLEAN_CARRIERS)
+def test_clean_carrier_is_not_flagged(tmp_path, name):
+    path = tmp_path / "clean.wav"
+    write_wav(path, CLEAN_CARRIERS[name])
+    result = analyze_file(str(path))
+    assert not result["suspicious"], result
+
+
+@pytest.mark.parametrize("name", ["smooth-sinusoid", "sinusoid"])
+def test_full_embedding_is_flagged(tmp_path, name):
+    carrier, encoded = tmp_path / "clean.wav", tmp_path / "encoded.wav"
+    samples = CLEAN_CARRIERS[name]
+    write_wav(carrier, samples)
+    message = np.random.default_rng(1).integers(0, 256, len(samples) // 8 - 32, dtype=np.uint8).tobytes()
+    hide_message(str(carrier), str(encoded), message, compression="none")
+    assert analyze_file(str(encoded))["suspicious"]
+
+
+def test_clean_sample_is_neither_flagged_nor_inconclusive():
+    result = analyze_file(SAMPLE)
+    assert not result["suspicious"] and not result["inconclusive"], result
+
+
+def test_embedding_in_sample_is_inconclusive(tmp_path):
+    # Наклон гистограммы реальной записи тонет в шуме: встраивание видно только по хи-квадрат,
+    # а его одного для вывода мало
+    encoded = str(tmp_path / "encoded.wav")
+    capacity = lsb_capacity(read_wav_header(SAMPLE), 1, None)
+    message = np.random.default_rng(1).integers(0, 256, capacity - 64, dtype=np.uint8).tobytes()
+    hide_message(SAMPLE, encoded, message, compression="none")
+    result = analyze_file(encoded)
+    assert result["histogram_rate"] is None
+    assert not result["suspicious"] and result["inconclusive"], result
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_clean_noise_is_not_flagged(tmp_path, seed):
+    path = tmp_path / "noise.wav"
+    write_wav(path, np.random.default_rng(seed).normal(0, 3000, FRAMERATE * 6))
+    assert not analyze_file(str(path))["suspicious"]
@@ -0,0 +1,29 @@
+import wave
+
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+import stft
+from stft import iter_frames
+
+
+def write_wav(path, samples):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(samples.astype('<i2').tobytes())
+
+
+@pytest.mark.parametrize("window, hop", [(512, 700), (512, 512), (2048, 1024), (100, 3000), (64, 1)])
+def test_frames_match_one_shot_framing(tmp_path, monkeypatch, window, hop):
+    # Маленькие блоки: кадры и пропуски между ними пересекают много границ блоков
+    monkeypatch.setattr(stft, "CHUNK_FRAMES", 1000)
+    samples = np.random.default_rng(0).integers(-32768, 32768, 200_000).astype(np.int16)
+    path = tmp_path / "signal.wav"
+    write_wav(path, samples)
+    expected = sliding_window_view(samples.astype(np.float64), window)[::hop]
+    frames = np.concatenate(list(iter_frames(str(path), window, hop)))
+    assert frames.shape == expected.shape
+    np.testing.assert_array_equal(frames, expected)
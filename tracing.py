@@ -0,0 +1,79 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class Trace:
+    """Необязательная трассировка операции: время фаз и записи о первых изменённых сэмплах.
+
+    Всё копится в памяти; по finish() отчёт передаётся в callback и/или пишется в JSON-файл.
+    """
+
+    enabled = True
+
+    def __init__(self, callback=None, json_path=None, max_samples=100):
+        self.callback = callback
+        self.json_path = json_path
+        self.max_samples = max_samples
+        self.info = {}
+        self.phases = {}
+        self.samples = []
+
+    @contextmanager
+    def phase(self, name):
+        """Замер времени фазы name (повторные замеры суммируются)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def set_info(self, **info):
+        self.info.update(info)
+
+    def record_samples(self, start, original, masks, modified):
+        """Запись сэмплов начиная с индекса start, пока не набрано max_samples записей."""
+        count = min(len(original), self.max_samples - len(self.samples))
+        for i in range(max(0, count)):
+            self.samples.append({
+                "index": start + i,
+                "original": int(original[i]),
+                "cleared_bits": int(original[i] & masks[i]),
+                "new_bits": int(modified[i] & ~masks[i]),
+                "modified": int(modified[i])
+            })
+
+    def report(self):
+        return {"info": self.info, "phases": self.phases, "samples": self.samples}
+
+    def finish(self):
+        """Передача отчёта в callback и запись в json_path (если заданы)."""
+        report = self.report()
+        if self.callback is not None:
+            self.callback(report)
+        if self.json_path is not None:
+            with open(self.json_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        return report
+
+
+class NullTrace:
+    """Трассировка по умолчанию: ничего не замеряет и ничего не пишет."""
+
+    enabled = False
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def set_info(self, **info):
+        pass
+
+    def record_samples(self, start, original, masks, modified):
+        pass
+
+    def finish(self):
+        return None
+
+
+NULL_TRACE = NullTrace()
@@ -0,0 +1,124 @@
+import struct
+import wave
+import numpy as np
+
+# Форматы в блоке fmt: целочисленный PCM, IEEE float и WAVE_FORMAT_EXTENSIBLE
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Поддерживаемые форматы сэмплов: (формат, байт на сэмпл) -> dtype для np.memmap
+SAMPLE_DTYPES = {
+    ("int", 1): np.uint8,
+    ("int", 2): np.dtype('<i2'),
+    ("int", 3): np.uint8,  # 24 бита: массив (n, 3) байтов
+    ("int", 4): np.dtype('<i4'),
+    ("float", 4): np.dtype('<f4')
+}
+
+
+def read_wav_header(wav_path):
+    """Разбор RIFF-заголовка WAV-файла без чтения сэмплов.
+
+    Возвращает параметры формата и положение блока data в файле.
+    """
+    with open(wav_path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"Файл {wav_path} не является WAV-файлом!")
+
+        fmt = None
+        file_size = f.seek(0, 2)
+        offset = 12
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+            if chunk_id == b"fmt ":
+                fmt = f.read(min(chunk_size, 40))
+            elif chunk_id == b"data":
+                if fmt is None or len(fmt) < 16:
+                    raise ValueError(f"В файле {wav_path} нет блока fmt перед data!")
+                format_tag, nchannels, framerate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                    # Первые два байта GUID подформата совпадают с обычным кодом формата
+                    format_tag = struct.unpack("<H", fmt[24:26])[0]
+                if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+                    raise ValueError(f"Файл {wav_path} не в формате PCM!")
+                data_offset = offset + 8
+                # Размер блока data может быть больше фактического у обрезанных файлов
+                data_size = min(chunk_size, file_size - data_offset)
+                return {
+                    "nchannels": nchannels,
+                    "sampwidth": block_align // nchannels,
+                    "format": "float" if format_tag == WAVE_FORMAT_IEEE_FLOAT else "int",
+                    "framerate": framerate,
+                    "nframes": data_size // block_align,
+                    "data_offset": data_offset,
+                    "data_size": data_size
+                }
+            # Блоки выравниваются по чётной границе
+            offset += 8 + chunk_size + (chunk_size & 1)
+
+    raise ValueError(f"В файле {wav_path} нет блока data!")
+
+
+def open_samples(wav_path, mode='r', header=None):
+    """Отображение сэмплов блока data в память (np.memmap) без копирования.
+
+    Для 8/16/32 бит — одномерный массив uint8/int16/int32/float32, для 24 бит — массив (n, 3) байтов.
+    mode='r' — только чтение, mode='r+' — изменение файла на месте.
+    """
+    if header is None:
+        header = read_wav_header(wav_path)
+    dtype = SAMPLE_DTYPES.get((header["format"], header["sampwidth"]))
+    if dtype is None:
+        raise ValueError(f"Формат {header['format']} {header['sampwidth'] * 8} бит в {wav_path} не поддерживается!")
+
+    count = header["nframes"] * header["nchannels"]
+    shape = (count, 3) if header["sampwidth"] == 3 else (count,)
+    if count == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(wav_path, dtype=dtype, mode=mode, offset=header["data_offset"], shape=shape)
+
+
+def lsb_bytes(samples):
+    """Представление младшего байта каждого сэмпла (little-endian) без копирования.
+
+    Изменение num_bits <= 8 младших битов затрагивает только этот байт в любом формате.
+    """
+    if samples.ndim == 2:
+        return samples[:, 0]
+    return samples.view(np.uint8).reshape(len(samples), samples.itemsize)[:, 0]
+
+
+def samples_to_float(samples, header):
+    """Перевод блока сэмплов в float64 (8 бит — без смещения 128, 24 бита — распаковка со знаком)."""
+    if header["sampwidth"] == 3:
+        packed = samples.astype(np.int32)
+        values = packed[:, 0] | (packed[:, 1] << 8) | (packed[:, 2] << 16)
+        return ((values << 8) >> 8).astype(np.float64)
+    if header["sampwidth"] == 1:
+        return samples.astype(np.float64) - 128
+    return samples.astype(np.float64)
+
+
+def read_frames(wav_path, header=None):
+    """Все сэмплы файла в float64 в виде матрицы (кадры, каналы) и заголовок WAV."""
+    if header is None:
+        header = read_wav_header(wav_path)
+    samples = open_samples(wav_path, header=header)
+    return samples_to_float(samples, header).reshape(header["nframes"], header["nchannels"]), header
+
+
+def write_pcm16(wav_path, samples, framerate):
+    """Запись сигнала (одномерного или (кадры, каналы)) в 16-битный WAV с округлением и обрезкой.
+
+    Возвращает записанные сэмплы int16.
+    """
+    pcm = np.clip(np.round(samples), -32768, 32767).astype('<i2')
+    with wave.open(wav_path, 'wb') as wav:
+        wav.setnchannels(1 if pcm.ndim == 1 else pcm.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(framerate)
+        wav.writeframes(pcm.tobytes())
+    return pcm